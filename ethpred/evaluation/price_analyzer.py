@@ -1,4 +1,4 @@
-from typing import Dict, Callable
+from typing import Dict, Callable, Union
 import heapq
 import functools
 from os import path
@@ -6,9 +6,12 @@ import datetime as dt
 import json
 import logging
 
+import numpy as np
+
 from .prediction_stats import PredictionResult, PredictionStats
 from ..pipeline.data_reader import read_data
 from ..predictor import get as get_predictor
+from ..predictor.block_table import BlockTable
 
 
 @functools.total_ordering
@@ -93,13 +96,20 @@ class PriceAnalyzer:
     """Analyze the gas price difference and the average time for inclusion
 
     Args:
-        min_prices: A mapping of block height to minimum price
+        min_prices: A mapping of block height to minimum price, or the BlockTable
+                    shared with the predictor
         predict_price: predict_price should be a function which takes
                        a block height and returns a gas price prediction/suggestion
+        predict_range: optional function which takes a first and last block height and
+                       returns the predictions of all the blocks in between at once,
+                       used instead of predict_price when given
     """
-    def __init__(self, min_prices: Dict[int, int], predict_price: Callable[[int], int]):
-        self.min_prices = min_prices
+    def __init__(self, min_prices: Union[BlockTable, Dict[int, int]],
+                 predict_price: Callable[[int], int],
+                 predict_range: Callable[[int, int], np.ndarray] = None):
+        self.blocks = BlockTable.create(min_prices)
         self.predict_price = predict_price
+        self.predict_range = predict_range
 
     def analyze_prices(self, start_block: int, end_block: int, final_block: int) -> PredictionStats:
         """Returns stats about gas price difference and the average time for inclusion
@@ -116,13 +126,17 @@ class PriceAnalyzer:
 
         total_blocks_count = final_block - start_block
 
+        predictions = None
+        if self.predict_range is not None:
+            predictions = self.predict_range(start_block, end_block).tolist()
+
         # wait until we added transactions until end_blocks
         # and included all of them or reached the final block after which we give up
         while block_number <= end_block or \
               (waiting_for_inclusion and block_number <= final_block):
             if block_number % 100 == 0:
                 logging.info("progress: %s/%s", block_number - start_block, total_blocks_count)
-            current_price = self.min_prices.get(block_number)
+            current_price = self.blocks.get_min_price(block_number)
             if not current_price:
                 block_number += 1
                 continue
@@ -137,7 +151,10 @@ class PriceAnalyzer:
             # if we already went above the end_block we are just waiting for
             # transactions to be included
             if block_number <= end_block:
-                predicted_price = self.predict_price(block_number)
+                if predictions is not None:
+                    predicted_price = predictions[block_number - start_block]
+                else:
+                    predicted_price = self.predict_price(block_number)
                 waiting_for_inclusion.push(TransactionInfo(block_number, predicted_price))
 
             block_number += 1
@@ -160,17 +177,19 @@ def make_filename(basename):
 def run_analysis(cnf):
     logging.info("loading data")
     _eth_price, gas_price = read_data(cnf)
+    # a single table of the blocks shared by the predictor and the analyzer
+    blocks = BlockTable.create(gas_price)
     logging.info("data loaded")
 
-    start_block = gas_price[-1]["block_number"] + cnf["evaluation"].get("skip", {}).get("start", 0)
-    final_block = gas_price[0]["block_number"]
+    start_block = blocks.first_block + cnf["evaluation"].get("skip", {}).get("start", 0)
+    final_block = blocks.last_block
     end_block = final_block - cnf["evaluation"].get("skip", {}).get("end", 0)
-    min_prices = {v["block_number"]: v["min_price_tx"]["gas_price"] for v in gas_price}
 
     Predictor = get_predictor(cnf["evaluation"]["predictor"]["class"])
-    predictor = Predictor.from_cnf(gas_price, cnf["evaluation"]["predictor"]["args"], cnf)
+    predictor = Predictor.from_cnf(blocks, cnf["evaluation"]["predictor"]["args"], cnf)
 
-    price_analyzer = PriceAnalyzer(min_prices, predictor.predict_price)
+    predict_range = predictor.predict_range if predictor.vectorized else None
+    price_analyzer = PriceAnalyzer(blocks, predictor.predict_price, predict_range)
 
     logging.info("running evaluation")
     stats = price_analyzer.analyze_prices(start_block, end_block, final_block)
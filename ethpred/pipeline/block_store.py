@@ -0,0 +1,269 @@
+import json
+import os
+from os import path
+import gzip as gz
+from array import array
+import datetime as dt
+import time
+
+import numpy as np
+import pandas as pd
+
+
+MANIFEST_FILE = 'manifest.json'
+STORE_VERSION = 1
+
+# name and dtype of the per-block columns kept in the store
+# prices are stored as float64 so that missing values can be represented as NaN
+SCALAR_COLUMNS = dict(
+    block_number=np.int64,
+    timestamp=np.int64,
+    average_gas_price=np.float64,
+    tx_count=np.float64,
+    min_price_tx=np.float64,
+    max_price_tx=np.float64,
+)
+
+# nested features stored as plain columns, e.g. `min_price_tx: gas_price`
+NESTED_COLUMNS = ('min_price_tx', 'max_price_tx')
+
+
+def local_datetime_index(timestamps) -> pd.DatetimeIndex:
+    """Vectorised equivalent of ``datetime.fromtimestamp`` which returns
+    naive datetimes in local time
+    """
+    timestamps = np.array(timestamps, dtype=np.float64)
+    valid = ~np.isnan(timestamps)
+    # UTC offsets only change on quarter hours, look them up once per quarter
+    quarters = np.floor(timestamps[valid] / 900).astype(np.int64)
+    unique_quarters, inverse = np.unique(quarters, return_inverse=True)
+    offsets = np.array([time.localtime(v * 900).tm_gmtoff for v in unique_quarters.tolist()],
+                       dtype=np.float64)
+    timestamps[valid] += offsets[inverse.reshape(-1)] if len(offsets) else 0
+    return pd.DatetimeIndex(pd.to_datetime(timestamps, unit='s'))
+
+
+class BlockColumns:
+    """Columnar view over blocks sorted by timestamp (oldest first)
+
+    The transactions gas prices are kept in a CSR-style ragged array:
+    the prices of the block ``i`` are ``tx_prices[tx_offsets[i]:tx_offsets[i + 1]]``
+
+    Args:
+        columns: A mapping of column name to an array with one value per block
+        tx_offsets: Offsets of the transactions of each block, of length ``len(self) + 1``
+        tx_prices: Gas prices of all the transactions
+    """
+    def __init__(self, columns: dict, tx_offsets: np.ndarray = None, tx_prices: np.ndarray = None):
+        self.columns = columns
+        if tx_offsets is None:
+            tx_offsets = np.zeros(len(columns['timestamp']) + 1, dtype=np.int64)
+            tx_prices = np.zeros(0, dtype=np.float64)
+        self.tx_offsets = tx_offsets
+        self.tx_prices = tx_prices
+
+    def __len__(self):
+        return len(self.columns['timestamp'])
+
+    def __getitem__(self, name: str) -> np.ndarray:
+        return self.columns[name]
+
+    def __contains__(self, name: str) -> bool:
+        return name in self.columns
+
+    def __repr__(self):
+        return "BlockColumns(blocks={0}, columns={1})".format(len(self), list(self.columns))
+
+    @property
+    def tx_counts(self) -> np.ndarray:
+        return np.diff(self.tx_offsets)
+
+    def transaction_prices(self, index: int) -> np.ndarray:
+        return self.tx_prices[self.tx_offsets[index]:self.tx_offsets[index + 1]]
+
+    def slice(self, start: int, stop: int) -> 'BlockColumns':
+        """Returns the blocks between the ``start`` and ``stop`` positions
+        without copying the per-block columns
+        """
+        start, stop, _step = slice(start, stop).indices(len(self))
+        stop = max(start, stop)
+        columns = {k: v[start:stop] for k, v in self.columns.items()}
+        tx_start, tx_stop = self.tx_offsets[start], self.tx_offsets[stop]
+        tx_offsets = np.asarray(self.tx_offsets[start:stop + 1]) - tx_start
+        return BlockColumns(columns, tx_offsets, self.tx_prices[tx_start:tx_stop])
+
+    def between(self, start_timestamp: float, end_timestamp: float) -> 'BlockColumns':
+        """Returns the blocks with ``start_timestamp <= timestamp <= end_timestamp``
+        """
+        timestamps = self.columns['timestamp']
+        start = np.searchsorted(timestamps, start_timestamp, side='left')
+        stop = np.searchsorted(timestamps, end_timestamp, side='right')
+        return self.slice(start, stop)
+
+    def select(self, names) -> 'BlockColumns':
+        """Keeps only the given columns, ``block_number`` and ``timestamp`` are always kept
+        """
+        keep = set(names) | {'block_number', 'timestamp'}
+        columns = {k: v for k, v in self.columns.items() if k in keep}
+        return BlockColumns(columns, self.tx_offsets, self.tx_prices)
+
+    @classmethod
+    def concatenate(cls, parts: list) -> 'BlockColumns':
+        """Concatenates several sets of blocks, the parts must be in timestamp order
+        """
+        parts = [v for v in parts if len(v) > 0]
+        if not parts:
+            return cls.empty()
+        names = [k for k in parts[0].columns if all(k in v for v in parts)]
+        columns = {k: np.concatenate([v[k] for v in parts]) for k in names}
+        offsets = [parts[0].tx_offsets[:1]]
+        total = 0
+        for part in parts:
+            offsets.append(np.asarray(part.tx_offsets[1:]) + total)
+            total += part.tx_offsets[-1]
+        tx_prices = np.concatenate([v.tx_prices for v in parts])
+        return cls(columns, np.concatenate(offsets), tx_prices)
+
+    @classmethod
+    def empty(cls) -> 'BlockColumns':
+        return cls({k: np.zeros(0, dtype=v) for k, v in SCALAR_COLUMNS.items()})
+
+    @classmethod
+    def from_blocks(cls, blocks) -> 'BlockColumns':
+        """Builds the columns from an iterable of raw blocks as found in the JSONL file
+        """
+        builder = BlockColumnsBuilder()
+        for block in blocks:
+            builder.add(block)
+        return builder.build()
+
+    def to_blocks(self) -> list:
+        """Returns a minimal list of raw blocks, newest first as in the JSONL file,
+        containing only what is needed by the predictors
+        """
+        blocks = []
+        block_numbers = self.columns['block_number'].tolist()
+        timestamps = self.columns['timestamp'].tolist()
+        min_prices = self.columns['min_price_tx'] if 'min_price_tx' in self.columns else None
+        for i in range(len(self) - 1, -1, -1):
+            block = dict(block_number=block_numbers[i], timestamp=timestamps[i])
+            if min_prices is not None and not np.isnan(min_prices[i]):
+                block['min_price_tx'] = dict(gas_price=int(min_prices[i]))
+            blocks.append(block)
+        return blocks
+
+
+class BlockColumnsBuilder:
+    """Accumulates raw blocks in compact arrays
+
+    Args:
+        with_transactions: Whether to keep the gas price of every transaction
+    """
+    def __init__(self, with_transactions: bool = True):
+        self.with_transactions = with_transactions
+        self.columns = {k: array('q' if v is np.int64 else 'd') for k, v in SCALAR_COLUMNS.items()}
+        self.tx_offsets = array('q', [0])
+        self.tx_prices = array('d')
+
+    def add(self, block: dict):
+        if 'timestamp' not in block:
+            return
+        for name in SCALAR_COLUMNS:
+            value = block.get(name)
+            if name in NESTED_COLUMNS and value is not None:
+                value = value.get('gas_price')
+            if self.columns[name].typecode == 'q':
+                value = 0 if value is None else int(value)
+            elif value is None:
+                value = np.nan
+            self.columns[name].append(value)
+        if self.with_transactions:
+            self.tx_prices.extend(tx['gas_price'] for tx in block.get('transactions', []))
+        self.tx_offsets.append(len(self.tx_prices))
+
+    def build(self) -> BlockColumns:
+        columns = {k: np.frombuffer(v, dtype=SCALAR_COLUMNS[k]) if len(v) else
+                   np.zeros(0, dtype=SCALAR_COLUMNS[k]) for k, v in self.columns.items()}
+        tx_offsets = np.frombuffer(self.tx_offsets, dtype=np.int64)
+        tx_prices = np.frombuffer(self.tx_prices, dtype=np.float64) if len(self.tx_prices) \
+            else np.zeros(0, dtype=np.float64)
+        return sort_by_timestamp(BlockColumns(columns, tx_offsets, tx_prices))
+
+
+def sort_by_timestamp(blocks: BlockColumns) -> BlockColumns:
+    timestamps = blocks['timestamp']
+    if np.all(timestamps[:-1] <= timestamps[1:]):
+        return blocks
+    # the JSONL file is newest first so a stable reversal is usually enough
+    if np.all(timestamps[:-1] >= timestamps[1:]):
+        order = np.arange(len(blocks) - 1, -1, -1)
+    else:
+        order = np.argsort(timestamps, kind='stable')
+    columns = {k: v[order] for k, v in blocks.columns.items()}
+    counts = blocks.tx_counts[order]
+    tx_offsets = np.zeros(len(order) + 1, dtype=np.int64)
+    np.cumsum(counts, out=tx_offsets[1:])
+    # position of every transaction in the original ragged array
+    starts = np.repeat(blocks.tx_offsets[:-1][order] - tx_offsets[:-1], counts)
+    tx_index = np.arange(tx_offsets[-1]) + starts
+    return BlockColumns(columns, tx_offsets, blocks.tx_prices[tx_index])
+
+
+def read_jsonl_blocks(gas_price_file: str) -> BlockColumns:
+    with gz.open(gas_price_file, 'r') as f:
+        return BlockColumns.from_blocks(json.loads(line) for line in f)
+
+
+def write_block_store(blocks: BlockColumns, store_path: str, source: str = None):
+    os.makedirs(store_path, exist_ok=True)
+    for name, column in blocks.columns.items():
+        np.save(path.join(store_path, name + '.npy'), column)
+    np.save(path.join(store_path, 'tx_offsets.npy'), blocks.tx_offsets)
+    np.save(path.join(store_path, 'tx_prices.npy'), blocks.tx_prices)
+    manifest = dict(
+        version=STORE_VERSION,
+        source=source,
+        blocks_count=len(blocks),
+        transactions_count=int(blocks.tx_offsets[-1]),
+        columns=list(blocks.columns),
+    )
+    with open(path.join(store_path, MANIFEST_FILE), 'w') as f:
+        json.dump(manifest, f, indent=2)
+
+
+def open_block_store(store_path: str, columns=None) -> BlockColumns:
+    """Memory-maps the store at ``store_path``, only the given ``columns`` are opened
+    if provided. Nothing is read from disk until the arrays are accessed
+    """
+    with open(path.join(store_path, MANIFEST_FILE)) as f:
+        manifest = json.load(f)
+    if manifest['version'] != STORE_VERSION:
+        raise ValueError("unsupported block store version {0}".format(manifest['version']))
+    names = manifest['columns']
+    if columns is not None:
+        missing = set(columns) - set(names)
+        if missing:
+            raise ValueError("columns {0} are not available in the block store".format(
+                sorted(missing)))
+        names = [v for v in names if v in columns or v in ('block_number', 'timestamp')]
+
+    def load(name):
+        return np.load(path.join(store_path, name + '.npy'), mmap_mode='r')
+
+    return BlockColumns({v: load(v) for v in names}, load('tx_offsets'), load('tx_prices'))
+
+
+def has_block_store(cnf: dict) -> bool:
+    store_path = cnf['data'].get('block_store')
+    return store_path is not None and path.exists(path.join(store_path, MANIFEST_FILE))
+
+
+def ingest_data(cnf: dict):
+    """One-time conversion of the gas price JSONL file to a block store"""
+    gas_price_file = cnf['data']['gas_price_file']
+    store_path = cnf['data']['block_store']
+    start = dt.datetime.now()
+    blocks = read_jsonl_blocks(gas_price_file)
+    write_block_store(blocks, store_path, source=path.abspath(gas_price_file))
+    print("Ingested {0} blocks to {1} in {2}".format(
+        len(blocks), store_path, dt.datetime.now() - start))
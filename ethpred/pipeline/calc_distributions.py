@@ -1,6 +1,72 @@
 import numpy as np
 
 
-def generate_distribution(transactions):
-    gas_prices = np.array([i['gas_price'] for i in transactions])
-    return np.mean(gas_prices), np.std(gas_prices)
+def generate_segment_distributions(offsets: np.ndarray, values: np.ndarray):
+    """Computes the mean and standard deviation of every segment
+    ``values[offsets[i]:offsets[i + 1]]`` at once, empty segments get NaN
+    """
+    offsets = np.asarray(offsets)
+    counts = np.diff(offsets)
+    means = np.full(len(counts), np.nan)
+    std_devs = np.full(len(counts), np.nan)
+    non_empty = counts > 0
+    if not np.any(non_empty):
+        return means, std_devs
+    values = np.asarray(values[offsets[0]:offsets[-1]], dtype=np.float64)
+    starts = offsets[:-1][non_empty] - offsets[0]
+    seg_counts = counts[non_empty]
+    seg_means = np.add.reduceat(values, starts) / seg_counts
+    # centre the values before squaring them to avoid losing precision on wei prices
+    centred = values - np.repeat(seg_means, seg_counts)
+    seg_vars = np.add.reduceat(centred * centred, starts) / seg_counts
+    means[non_empty] = seg_means
+    std_devs[non_empty] = np.sqrt(seg_vars)
+    return means, std_devs
+
+
+def generate_transaction_summary(offsets: np.ndarray, values: np.ndarray, method: str,
+                                 size: int, min_price: float = 1e8, max_price: float = 1e12):
+    """Summarises the gas prices of every segment with ``size`` values:
+
+    * ``quantiles``: evenly spaced quantiles from the minimum to the maximum price
+    * ``histogram``: share of the transactions in ``size`` log-spaced price bins
+      between ``min_price`` and ``max_price``, prices outside go to the outer bins
+    * ``top_k``: the ``size`` highest prices in decreasing order
+
+    Returns: an array of shape ``(len(offsets) - 1, size)``, NaN where undefined
+    """
+    offsets = np.asarray(offsets)
+    counts = np.diff(offsets)
+    values = np.asarray(values[offsets[0]:offsets[-1]], dtype=np.float64)
+    starts = offsets[:-1] - offsets[0]
+    segments = np.repeat(np.arange(len(counts)), counts)
+
+    if method == 'histogram':
+        edges = np.logspace(np.log10(min_price), np.log10(max_price), size + 1)
+        bins = np.clip(np.searchsorted(edges, values, side='right') - 1, 0, size - 1)
+        hist = np.bincount(segments * size + bins, minlength=len(counts) * size)
+        return hist.reshape(len(counts), size) / np.maximum(counts, 1)[:, None]
+
+    # sort the prices inside every segment
+    sorted_values = values[np.lexsort((values, segments))]
+    non_empty = counts > 0
+    if method == 'quantiles':
+        positions = np.linspace(0, 1, size)[None, :] * np.maximum(counts - 1, 0)[:, None]
+        lower = np.floor(positions).astype(np.int64)
+        upper = np.ceil(positions).astype(np.int64)
+        fraction = positions - lower
+        if len(sorted_values) == 0:
+            return np.full((len(counts), size), np.nan)
+        low_values = sorted_values[np.minimum(starts[:, None] + lower, len(sorted_values) - 1)]
+        high_values = sorted_values[np.minimum(starts[:, None] + upper, len(sorted_values) - 1)]
+        summary = low_values + (high_values - low_values) * fraction
+        summary[~non_empty] = np.nan
+        return summary
+    if method == 'top_k':
+        ranks = np.arange(size)[None, :]
+        indices = (starts + counts - 1)[:, None] - ranks
+        summary = np.full((len(counts), size), np.nan)
+        available = ranks < counts[:, None]
+        summary[available] = sorted_values[indices[available]]
+        return summary
+    raise ValueError("unknown transaction summary method {0}".format(method))
@@ -1,33 +1,81 @@
 import json
-from os import path
 import gzip as gz
+from os import path
 from datetime import datetime
 import datetime as dt
-import pickle
 
+import numpy as np
 import pandas as pd
 
-
-def get_cache_path(cnf):
-    base_cache_path = cnf['data'].get('cache_path')
-    if base_cache_path is None:
-        return None
-    basename, ext = path.splitext(base_cache_path)
-    return "{0}--{1}--{2}{3}".format(
-        basename, cnf['data']['start_date'], cnf['data']['end_date'], ext)
+from .block_store import BlockColumns, has_block_store, open_block_store
+from .jsonl_index import GasPriceIndex, get_index_path, has_gas_price_index
+from .dataset_cache import create_cache, file_identity, hash_key, block_fields, trim_block, \
+    frame_fields
+from .to_pandas import convert_to_dataframe
+from .parallel_reader import read_block_columns
 
 
 def read_data(cnf: dict):
-    cache_path = get_cache_path(cnf)
-
-    if cache_path is not None and path.exists(cache_path):
-        with open(cache_path, 'rb') as f:
-            return pickle.load(f)
-
     start_time = datetime.fromisoformat(cnf['data']['start_date']) - dt.timedelta(days=1.5)
     end_time = datetime.fromisoformat(cnf['data']['end_date'])
 
-    eth_price_file = cnf['data']['eth_price_file']
+    # the block store is memory-mapped so there is no point in caching it
+    if has_block_store(cnf):
+        return read_eth_price(cnf), read_block_store(cnf, start_time, end_time)
+
+    cache = create_cache(cnf)
+    if cache is None or cnf['testing']:
+        gas_price = read_gas_price_file(cnf, start_time, end_time)
+    else:
+        gas_price = read_cached_gas_price(cnf, cache, start_time, end_time)
+
+    return read_eth_price(cnf), gas_price
+
+
+def read_dataframe(cnf: dict, normalizers: dict = None):
+    """Returns the output of ``convert_to_dataframe``, cached when a cache is configured"""
+    cache = create_cache(cnf)
+    if cache is None:
+        eth_price, gas_price = read_data(cnf)
+        return convert_to_dataframe(eth_price, gas_price, cnf, normalizers)
+
+    fitted = None if normalizers is None else {k: v.to_dict() for k, v in normalizers.items()}
+    key = hash_key(source_identity(cnf), eth_source_identity(cnf), frame_fields(cnf), fitted)
+    result = cache.get('frames', key, 'dataframe')
+    if result is None:
+        eth_price, gas_price = read_data(cnf)
+        result = convert_to_dataframe(eth_price, gas_price, cnf, normalizers)
+        cache.put('frames', key, 'dataframe', result)
+    return result
+
+
+def source_identity(cnf: dict):
+    if has_block_store(cnf):
+        return file_identity(cnf['data']['block_store'] + '/manifest.json')
+    return file_identity(gas_price_source(cnf))
+
+
+def gas_price_source(cnf: dict) -> str:
+    """The JSONL file the blocks are read from, the indexed copy when it has been built"""
+    indexed_file = cnf['data'].get('indexed_gas_price_file')
+    if not cnf['testing'] and has_gas_price_index(indexed_file):
+        return indexed_file
+    return cnf['data']['gas_price_file']
+
+
+def eth_source_identity(cnf: dict):
+    if has_eth_price_store(cnf):
+        return file_identity(cnf['data']['eth_price_store'])
+    return file_identity(cnf['data']['eth_price_file'])
+
+
+def read_eth_price(cnf: dict):
+    if has_eth_price_store(cnf):
+        return read_eth_price_store(cnf['data']['eth_price_store'])
+    return read_eth_price_file(cnf['data']['eth_price_file'])
+
+
+def read_eth_price_file(eth_price_file: str):
     if eth_price_file.endswith('.csv'):
         eth_price = pd.read_csv(eth_price_file)
     elif eth_price_file.endswith('.json'):
@@ -35,30 +83,146 @@ def read_data(cnf: dict):
             eth_price = json.load(f)
     else:
         raise NotImplementedError
+    return eth_price
+
+
+def has_eth_price_store(cnf: dict) -> bool:
+    store_file = cnf['data'].get('eth_price_store')
+    return store_file is not None and path.exists(store_file)
+
+
+def read_eth_price_store(store_file: str) -> pd.DataFrame:
+    """Reads the ETH price ticks written by ``ingest_eth_price``, already sorted by date"""
+    with np.load(store_file) as store:
+        return pd.DataFrame({k: store[k] for k in store.files})
+
+
+def ingest_eth_price(cnf: dict):
+    """One-time conversion of the ``eth_price_features`` of the ETH price ticks to a binary
+    file sorted by date. Only numeric arrays are stored so that no pickle is needed to load it
+    """
+    store_file = cnf['data']['eth_price_store']
+    eth_price = read_eth_price_file(cnf['data']['eth_price_file'])
+    if isinstance(eth_price, dict):
+        eth_price = pd.DataFrame.from_dict(eth_price)
+    columns = [v for v in cnf['data']['eth_price_features'] if v != 'date']
+    eth_price = eth_price[['date'] + columns].assign(date=pd.to_datetime(eth_price['date']))
+    eth_price = eth_price.dropna(axis='rows', subset=['date']).sort_values(by='date', kind='stable')
+    arrays = {k: pd.to_numeric(eth_price[k], errors='coerce').to_numpy(dtype=np.float64)
+              for k in columns}
+    arrays['date'] = eth_price['date'].to_numpy(dtype='datetime64[ns]')
+    with open(store_file, 'wb') as f:
+        np.savez(f, **arrays)
+    print("Ingested {0} ETH price ticks to {1}".format(len(eth_price), store_file))
+
+
+def read_block_store(cnf: dict, start_time: datetime, end_time: datetime):
+    blocks = open_block_store(cnf['data']['block_store'])
+    if cnf['testing']:
+        return blocks.slice(-1000, len(blocks))
+    return blocks.between(start_time.timestamp(), end_time.timestamp())
+
+
+def read_cached_gas_price(cnf: dict, cache, start_time: datetime, end_time: datetime):
+    """Reads the blocks by day, the days already in the cache are not parsed again"""
+    fields = block_fields(cnf)
+    fields['columns'] = use_parallel_reader(cnf)
+    key = hash_key(source_identity(cnf), fields)
+    days = [start_time.date() + dt.timedelta(days=i)
+            for i in range((end_time.date() - start_time.date()).days + 1)]
+
+    partitions = {day: cache.get('raw', key, day.isoformat()) for day in days}
+    missing = [day for day, blocks in partitions.items() if blocks is None]
+    if missing:
+        if fields['columns']:
+            parsed = read_block_columns_days(cnf, missing)
+        else:
+            parsed = read_gas_price_days(cnf, missing, fields)
+        for day, blocks in parsed.items():
+            cache.put('raw', key, day.isoformat(), blocks)
+        partitions.update(parsed)
+
+    if fields['columns']:
+        blocks = BlockColumns.concatenate([partitions[day] for day in days])
+        return blocks.between(start_time.timestamp(), end_time.timestamp())
 
     gas_price = []
-    with gz.open(cnf['data']['gas_price_file'], 'r') as f:
-        if cnf['testing']:
-            count = 0
+    for day in reversed(days):
+        for block in partitions[day]:
+            time = datetime.fromtimestamp(block['timestamp'])
+            if start_time <= time <= end_time:
+                gas_price.append(block)
+    return gas_price
+
+
+def read_gas_price_days(cnf: dict, days: list, fields: dict) -> dict:
+    """Parses the full days given, the blocks of each day are newest first"""
+    start_time = datetime.combine(min(days), dt.time())
+    end_time = datetime.combine(max(days) + dt.timedelta(days=1), dt.time())
+    partitions = {day: [] for day in days}
+    for line in iter_gas_price_lines(cnf, start_time, end_time):
+        current = json.loads(line)
+        if 'timestamp' not in current:
+            continue
+        time = datetime.fromtimestamp(current['timestamp'])
+        if time < start_time:
+            break
+        if time.date() in partitions:
+            partitions[time.date()].append(trim_block(current, fields))
+    return partitions
+
+
+def read_block_columns_days(cnf: dict, days: list) -> dict:
+    start_time = datetime.combine(min(days), dt.time())
+    end_time = datetime.combine(max(days) + dt.timedelta(days=1), dt.time())
+    blocks = read_block_columns(cnf, start_time, end_time)
+    partitions = {}
+    for day in days:
+        day_start = datetime.combine(day, dt.time()).timestamp()
+        day_end = datetime.combine(day + dt.timedelta(days=1), dt.time()).timestamp()
+        start, stop = np.searchsorted(blocks['timestamp'], [day_start, day_end], side='left')
+        partitions[day] = blocks.slice(start, stop)
+    return partitions
+
+
+def use_parallel_reader(cnf: dict) -> bool:
+    return not cnf['testing'] and cnf['data'].get('reader_workers', 1) > 1
+
+
+def iter_gas_price_lines(cnf: dict, start_time: datetime, end_time: datetime):
+    indexed_file = cnf['data'].get('indexed_gas_price_file')
+    if has_gas_price_index(indexed_file):
+        index = GasPriceIndex.load(get_index_path(indexed_file))
+        members = index.members_between(start_time.timestamp(), end_time.timestamp())
+        yield from index.iter_lines(indexed_file, members)
+    else:
+        with gz.open(cnf['data']['gas_price_file'], 'r') as f:
+            yield from f
+
+
+def read_gas_price_file(cnf: dict, start_time: datetime, end_time: datetime):
+    if cnf['testing']:
+        gas_price = []
+        with gz.open(cnf['data']['gas_price_file'], 'r') as f:
             for line in f:
                 gas_price.append(json.loads(line))
-                count += 1
-                if count >= 1000:
+                if len(gas_price) >= 1000:
                     break
-        else:
-            for line in f:
-                current = json.loads(line)
-                if 'timestamp' in current:
-                    time = datetime.fromtimestamp(current['timestamp'])
-                    if time <= end_time:
-                        gas_price.append(current)
-                    if time < start_time:
-                        break
+        return gas_price
+    if use_parallel_reader(cnf):
+        return read_block_columns(cnf, start_time, end_time)
+    return collect_blocks(iter_gas_price_lines(cnf, start_time, end_time), start_time, end_time)
 
-    result = (eth_price, gas_price)
 
-    if cache_path is not None:
-        with open(cache_path, 'wb') as f:
-            pickle.dump(result, f)
-
-    return result
+def collect_blocks(lines, start_time: datetime, end_time: datetime):
+    """Parses the lines of the newest first JSONL file until ``start_time`` is reached"""
+    gas_price = []
+    for line in lines:
+        current = json.loads(line)
+        if 'timestamp' in current:
+            time = datetime.fromtimestamp(current['timestamp'])
+            if time <= end_time:
+                gas_price.append(current)
+            if time < start_time:
+                break
+    return gas_price
@@ -0,0 +1,132 @@
+import os
+from os import path
+import json
+import pickle
+import hashlib
+
+
+CACHE_VERSION = 1
+
+# keys of the data configuration which do not change the output of convert_to_dataframe,
+# the files the data is read from are keyed on their identity instead of their path
+NON_FRAME_KEYS = frozenset([
+    'batch_size', 'block_store', 'cache_dir', 'cache_max_gb', 'cache_path', 'data_path',
+    'energy', 'eth_price_file', 'eth_price_store', 'fft', 'fft_batch_size', 'fft_dtype',
+    'fft_workers', 'gas_price_file', 'indexed_gas_price_file', 'inference_batch_size',
+    'lazy_windows', 'num_workers', 'persistent_workers', 'pin_memory', 'prefetch_factor',
+    'reader_chunk_lines', 'reader_workers', 'sample_freq', 'shuffle', 'tensor_path',
+    'train_prop', 'window_size', 'y_cols', 'y_len',
+])
+
+
+def file_identity(filename: str):
+    """Cheap identity of a file which changes whenever it is rewritten"""
+    if filename is None:
+        return None
+    stat = os.stat(filename)
+    return dict(path=path.abspath(filename), size=stat.st_size, mtime=stat.st_mtime_ns)
+
+
+def hash_key(*values) -> str:
+    payload = json.dumps([CACHE_VERSION] + list(values), sort_keys=True, default=str)
+    return hashlib.sha1(payload.encode('utf-8')).hexdigest()
+
+
+def get_cache_dir(cnf: dict):
+    cache_dir = cnf['data'].get('cache_dir')
+    if cache_dir is None and cnf['data'].get('cache_path') is not None:
+        # older configurations point to a pickle file
+        cache_dir = path.splitext(cnf['data']['cache_path'])[0]
+    return cache_dir
+
+
+def create_cache(cnf: dict):
+    cache_dir = get_cache_dir(cnf)
+    if cache_dir is None:
+        return None
+    max_gb = cnf['data'].get('cache_max_gb')
+    max_size = None if max_gb is None else int(max_gb * 1024 ** 3)
+    return DatasetCache(cache_dir, max_size)
+
+
+def block_fields(cnf: dict) -> dict:
+    """Fields of the raw blocks needed by the pipeline, the raw partitions are keyed on them"""
+    keys = set(cnf['data']['features'])
+    keys.update(list(v.keys())[0] for v in cnf['data']['nested_features'])
+    keys.update(['block_number', 'timestamp', 'min_price_tx'])
+    return dict(keys=sorted(keys), transactions=cnf['type'] == 'distribution')
+
+
+def trim_block(block: dict, fields: dict) -> dict:
+    trimmed = {k: block[k] for k in fields['keys'] if k in block}
+    if fields['transactions'] and 'transactions' in block:
+        trimmed['transactions'] = [dict(gas_price=v['gas_price']) for v in block['transactions']]
+    return trimmed
+
+
+def frame_fields(cnf: dict) -> dict:
+    """Fields of the configuration which change the output of convert_to_dataframe"""
+    data_cnf = {k: v for k, v in cnf['data'].items() if k not in NON_FRAME_KEYS}
+    return dict(type=cnf['type'], testing=cnf['testing'], data=data_cnf)
+
+
+class DatasetCache:
+    """Content-addressed on-disk cache
+
+    Entries are pickled under ``cache_dir/<namespace>/<key>/<name>.pickle``.
+    When ``max_size`` is given, the least recently used entries are evicted
+    until the total size of the cache is under ``max_size`` bytes
+
+    Args:
+        cache_dir: directory in which to store the entries
+        max_size: maximum total size of the cache in bytes
+    """
+    def __init__(self, cache_dir: str, max_size: int = None):
+        self.cache_dir = cache_dir
+        self.max_size = max_size
+
+    def entry_path(self, namespace: str, key: str, name: str) -> str:
+        return path.join(self.cache_dir, namespace, key, name + '.pickle')
+
+    def get(self, namespace: str, key: str, name: str):
+        entry_path = self.entry_path(namespace, key, name)
+        if not path.exists(entry_path):
+            return None
+        with open(entry_path, 'rb') as f:
+            value = pickle.load(f)
+        # the modification time is used as the access time for the LRU eviction
+        os.utime(entry_path)
+        return value
+
+    def put(self, namespace: str, key: str, name: str, value):
+        entry_path = self.entry_path(namespace, key, name)
+        os.makedirs(path.dirname(entry_path), exist_ok=True)
+        tmp_path = entry_path + '.tmp'
+        with open(tmp_path, 'wb') as f:
+            pickle.dump(value, f, protocol=pickle.HIGHEST_PROTOCOL)
+        os.replace(tmp_path, entry_path)
+        self.evict(keep=entry_path)
+
+    def entries(self):
+        for root, _dirs, files in os.walk(self.cache_dir):
+            for filename in files:
+                if filename.endswith('.pickle'):
+                    entry_path = path.join(root, filename)
+                    stat = os.stat(entry_path)
+                    yield stat.st_mtime_ns, stat.st_size, entry_path
+
+    def size(self) -> int:
+        return sum(size for _mtime, size, _path in self.entries())
+
+    def evict(self, keep: str = None):
+        if self.max_size is None:
+            return
+        entries = sorted(self.entries())
+        total = sum(size for _mtime, size, _path in entries)
+        for _mtime, size, entry_path in entries:
+            if total <= self.max_size:
+                break
+            if entry_path == keep:
+                continue
+            os.remove(entry_path)
+            total -= size
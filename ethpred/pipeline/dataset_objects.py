@@ -1,6 +1,10 @@
+import numpy as np
 import torch
 import torch.utils.data as du
 
+from .fft_truncation import get_k_fft_by_percentage_energy_above_mean
+
+
 class TimeSeriesData(du.Dataset):
     """
     Wrapper for time series data to be used by pytorch DataLoader.
@@ -25,4 +29,75 @@ class TimeSeriesData(du.Dataset):
         if self.batch_first:
             return self.X.shape[0]
         else:
-            return self.X.shape[1]
\ No newline at end of file
+            return self.X.shape[1]
+
+
+class ContiguousBatchSampler(du.Sampler):
+    """
+    Yields slices of ``batch_size`` consecutive items, to be used with ``batch_size=None``
+    so that a batch is a single slice of the tensors instead of a collation of items.
+    With ``indices`` the range of indices of every batch is yielded instead, to be used
+    as the ``batch_sampler`` of a loader collating the items.
+    With ``shuffle`` the order of the batches is shuffled, not their content.
+    """
+
+    def __init__(self, length, batch_size, shuffle=False, drop_last=False, indices=False):
+        self.length = length
+        self.batch_size = batch_size
+        self.shuffle = shuffle
+        self.drop_last = drop_last
+        self.indices = indices
+
+    def __iter__(self):
+        starts = torch.arange(0, len(self) * self.batch_size, self.batch_size)
+        if self.shuffle:
+            starts = starts[torch.randperm(len(starts))]
+        batch_type = range if self.indices else slice
+        for start in starts.tolist():
+            yield batch_type(start, min(start + self.batch_size, self.length))
+
+    def __len__(self):
+        if self.drop_last:
+            return self.length // self.batch_size
+        return (self.length + self.batch_size - 1) // self.batch_size
+
+
+class SlidingWindowData(du.Dataset):
+    """
+    Windows of a time series sliced on the fly, only the series is kept in memory.
+    """
+
+    def __init__(self, series, starts, window_size, y_len, y_col_idxs):
+        self.series = series
+        self.starts = starts
+        self.window_size = window_size
+        self.y_len = y_len
+        self.y_col_idxs = y_col_idxs
+
+    def __getitem__(self, item):
+        start = self.starts[item]
+        x_t = self.series[start:start + self.window_size]
+        y_start = start + self.window_size
+        y_t = torch.squeeze(self.series[y_start:y_start + self.y_len, self.y_col_idxs])
+        return x_t, y_t
+
+    def __len__(self):
+        return len(self.starts)
+
+
+class FFTTruncationCollate:
+    """
+    Collates a batch and truncates the FFT of its windows, so that the truncation
+    runs in the DataLoader (and its workers) rather than as a pass over all the windows.
+    """
+
+    def __init__(self, energy, dtype=np.float32):
+        self.energy = energy
+        self.dtype = dtype
+
+    def __call__(self, batch):
+        x, y = du.default_collate(batch)
+        x_fft, _avg_k = get_k_fft_by_percentage_energy_above_mean(
+            x.numpy().astype(self.dtype, copy=False), self.energy)
+        # the FFT may run in float64, the models take float32 batches
+        return torch.from_numpy(x_fft).float(), y
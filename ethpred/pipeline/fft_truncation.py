@@ -1,3 +1,5 @@
+from concurrent.futures import ThreadPoolExecutor
+
 import numpy as np
 import numpy.fft as fft
 
@@ -21,6 +23,33 @@ def squared_L2_norm_complex_cumsum(sample: np.ndarray, len_x: int, axis: int) ->
     return total / (len_x ** 2)
 
 
+def truncate_spectrum(fft_real: np.ndarray, len_x: int, energy: float, axis: int = 1) -> np.ndarray:
+    """
+    Zeroes, in place, the terms of the Fourier transform above the minimum energy bound.
+    The energy is measured above the mean, i.e. the first term is always included.
+    :param fft_real: FFT dataset, modified in place
+    :param len_x: Length of the original dataset, i.e. before applying the FFT.
+    :param energy: Minimum energy threshold
+    :param axis: Axis of the frequencies
+    :return: number k of terms included for each sequence
+    """
+    # Calculate the energy cumsum for each term
+    sum_energy = 2 * squared_L2_norm_complex_cumsum(fft_real, len_x, axis=axis)
+
+    mean_terms = np.take(sum_energy, [0], axis=axis)
+
+    # in place to avoid allocating more arrays of the size of the FFT
+    sum_energy -= mean_terms
+    max_cum = np.take(sum_energy, [-1], axis=axis)
+
+    with np.errstate(invalid='ignore', divide='ignore'):
+        sum_energy /= max_cum
+
+    k_filter = sum_energy >= energy
+    fft_real[k_filter] = 0
+    return np.argmax(k_filter, axis=axis)
+
+
 def get_k_fft_by_percentage_energy_above_mean(data: np.array, energy: float,
                                               return_complex: bool = False) -> tuple:
     """
@@ -34,25 +63,11 @@ def get_k_fft_by_percentage_energy_above_mean(data: np.array, energy: float,
     # Non-normalized FFT
     fft_real = generate_per_sequence_fft(data)
 
-    # Calculate the energy cumsum for each term
-    sum_energy = (
-            2 * squared_L2_norm_complex_cumsum(fft_real, data.shape[1], axis=1))
-
-    mean_terms = sum_energy[:, 0, :]
-
-    sum_energy = sum_energy - mean_terms[:, None, :]
-    max_cum = sum_energy[:, -1, :]
-
-    sum_energy = sum_energy / max_cum[:, None, :]
-
-    k_thresh = np.argmax(sum_energy >= energy, axis=1)
+    k_thresh = truncate_spectrum(fft_real, data.shape[1], energy, axis=1)
     avg_k = np.mean(k_thresh)
     # print("Average k:", avg_k)
     # print("Average communication saving:", 1 - np.mean(k_thresh) * 2 / data.shape[1])
 
-    k_filter = sum_energy >= energy
-    fft_real[k_filter] = 0
-
     # print("Data shape in trunc func:", data.shape)
     # print("FFT shape in trunc func:", fft_real.shape)
 
@@ -71,6 +86,45 @@ def get_k_fft_by_percentage_energy_above_mean(data: np.array, energy: float,
     return k_real_recon, avg_k
 
 
+def truncate_fft_batched(data: np.ndarray, energy: float, batch_size: int = 1024,
+                         dtype=np.float32, workers: int = None) -> tuple:
+    """
+    Same as get_k_fft_by_percentage_energy_above_mean but processes the windows
+    in batches of ``batch_size`` so that the temporaries stay small.
+    NumPy releases the GIL during the FFT so the batches can run in ``workers`` threads.
+    :param data: Dataset to use, windows along the first axis
+    :param energy: Minimum energy threshold
+    :param batch_size: Number of windows processed at once
+    :param dtype: Precision of the computations and of the output
+    :param workers: Number of threads to use, no thread pool if None
+    :return: reconstructed dataset, average number k of terms included in the truncated Fourier transform
+    """
+    out = np.empty(data.shape, dtype=dtype)
+    starts = range(0, data.shape[0], batch_size)
+
+    def truncate(start):
+        batch = np.asarray(data[start:start + batch_size], dtype=dtype)
+        out[start:start + batch.shape[0]], avg_k = \
+            get_k_fft_by_percentage_energy_above_mean(batch, energy)
+        return avg_k * batch.shape[0]
+
+    if workers:
+        with ThreadPoolExecutor(max_workers=workers) as executor:
+            k_totals = list(executor.map(truncate, starts))
+    else:
+        k_totals = [truncate(start) for start in starts]
+    avg_k = sum(k_totals) / data.shape[0] if data.shape[0] else 0
+    return out, avg_k
+
+
+def fft_options(cnf_data: dict) -> dict:
+    return dict(
+        batch_size=cnf_data.get('fft_batch_size', 1024),
+        dtype=np.dtype(cnf_data.get('fft_dtype', 'float32')),
+        workers=cnf_data.get('fft_workers'),
+    )
+
+
 def get_k_fft_by_max_RMSE(data: np.array, max_err: float, return_complex: bool = False):
     # Non-normalized FFT
     fft_real = generate_per_sequence_fft(data)
@@ -99,3 +153,61 @@ def get_k_fft_by_max_RMSE(data: np.array, max_err: float, return_complex: bool =
     k_real_recon = fft.irfft(fft_real, n=data.shape[1], axis=1)
 
     return k_real_recon, avg_k
+
+
+class SlidingDFT:
+    """
+    Incremental DFT of a sliding window, for live inference where one new sample
+    arrives at a time. Shifting the window by one sample updates every term in O(1):
+    X_k <- (X_k - x_old + x_new) * exp(2j * pi * k / W)
+    so a step costs O(W) instead of the O(W log W) of a new FFT.
+    The spectrum is recomputed from the window every ``recompute_every`` steps
+    to bound the accumulated rounding errors.
+
+    Args:
+        window: Initial window, of shape (window_size, features)
+        energy: Minimum energy threshold, as in get_k_fft_by_percentage_energy_above_mean
+        recompute_every: Number of steps between two full FFTs
+    """
+    def __init__(self, window: np.ndarray, energy: float, recompute_every: int = 1000):
+        self.window_size = window.shape[0]
+        self.energy = energy
+        self.recompute_every = recompute_every
+        # ring buffer of the window, the oldest sample is at self.head
+        self.buffer = np.array(window, dtype=np.float64)
+        self.head = 0
+        k = np.arange(self.window_size // 2 + 1)
+        self.twiddle = np.exp(2j * np.pi * k / self.window_size)[:, None]
+        self.spectrum = generate_per_sequence_fft(self.buffer, axis=0)
+        self.steps = 0
+
+    @property
+    def window(self) -> np.ndarray:
+        """Current window, oldest sample first"""
+        return np.roll(self.buffer, -self.head, axis=0)
+
+    def update(self, sample: np.ndarray):
+        """Slides the window by one sample"""
+        sample = np.asarray(sample, dtype=np.float64)
+        self.spectrum += sample - self.buffer[self.head]
+        self.spectrum *= self.twiddle
+        self.buffer[self.head] = sample
+        self.head = (self.head + 1) % self.window_size
+        self.steps += 1
+        if self.steps % self.recompute_every == 0:
+            self.spectrum = generate_per_sequence_fft(self.window, axis=0)
+
+    def push(self, samples: np.ndarray) -> np.ndarray:
+        """Slides the window by every sample given and returns the truncated newest window"""
+        for sample in np.atleast_2d(samples):
+            self.update(sample)
+        return self.truncated()[0]
+
+    def truncated(self) -> tuple:
+        """
+        Reconstructs the current window from its truncated Fourier transform.
+        :return: reconstructed window, number k of terms included for each feature
+        """
+        fft_real = self.spectrum.copy()
+        k_thresh = truncate_spectrum(fft_real, self.window_size, self.energy, axis=0)
+        return fft.irfft(fft_real, n=self.window_size, axis=0), k_thresh
@@ -1,18 +1,17 @@
 import numpy as np
+from numpy.lib.stride_tricks import sliding_window_view
 import pandas as pd
 import torch.utils.data as du
 import torch
 import matplotlib.pyplot as plt
-from .data_reader import read_data
-from .to_pandas import convert_to_dataframe
-from .dataset_objects import TimeSeriesData
-from .calc_distributions import generate_distribution
-from .fft_truncation import get_k_fft_by_percentage_energy_above_mean
+from .data_reader import read_dataframe
+from .dataset_objects import TimeSeriesData, SlidingWindowData, FFTTruncationCollate, \
+    ContiguousBatchSampler
+from .fft_truncation import truncate_fft_batched, fft_options
 
 
-def generate_data(cnf: dict):
-    eth_price, gas_price = read_data(cnf)
-    data, _normalizers = convert_to_dataframe(eth_price, gas_price, cnf)
+def generate_data(cnf: dict, return_normalizers: bool = False):
+    data, normalizers = read_dataframe(cnf)
 
     # Only include the columns wanted for y
     if cnf['type'] == 'distribution':
@@ -22,7 +21,7 @@ def generate_data(cnf: dict):
         idx = data.columns.get_loc(col)
         y_col_idxs.append(idx)
 
-    data = data.to_numpy()
+    data = data.to_numpy(dtype=np.float32)
 
     print('before sliding window:', data.shape)
 
@@ -41,49 +40,67 @@ def generate_data(cnf: dict):
     train_len = int(data_len * cnf['data']['train_prop'])
     X_train, y_train = X[:train_len], y[:train_len]
     X_test, y_test = X[train_len:], y[train_len:]
+
+    if return_normalizers:
+        return X_train, X_test, y_train, y_test, normalizers
+
     return X_train, X_test, y_train, y_test
 
 
 def create_dataloaders(X_train, y_train, X_test, y_test, cnf):
-    train_dataloader = create_dataloader(X_train, y_train, cnf['data']['batch_size'])
-    test_dataloader = create_dataloader(X_test, y_test, cnf['data']['batch_size'])
+    train_dataloader = create_dataloader(X_train, y_train, cnf['data']['batch_size'],
+                                         shuffle=cnf['data'].get('shuffle', False),
+                                         pin_memory=cnf['data'].get('pin_memory', False))
+    test_dataloader = create_dataloader(X_test, y_test, cnf['data']['batch_size'],
+                                        pin_memory=cnf['data'].get('pin_memory', False))
     return train_dataloader, test_dataloader
 
 
+def loader_options(cnf_data: dict) -> dict:
+    """Options of the DataLoaders loading the items one by one"""
+    options = dict(num_workers=cnf_data.get('num_workers', 0),
+                   pin_memory=cnf_data.get('pin_memory', False))
+    # only valid with worker processes
+    if options['num_workers'] > 0:
+        options['persistent_workers'] = cnf_data.get('persistent_workers', False)
+        if cnf_data.get('prefetch_factor') is not None:
+            options['prefetch_factor'] = cnf_data['prefetch_factor']
+    return options
 
-def sliding_window(data: np.ndarray, cnf_data: dict, return_indices: bool = False):
+
+def window_starts(num_rows: int, cnf_data: dict) -> np.ndarray:
+    """Returns the row at which every window starts"""
     window_size = cnf_data['window_size']
     y_len = cnf_data['y_len']
     sample_freq = cnf_data['sample_freq']
 
-    overlap = (data.shape[0] - window_size) % (y_len)
+    overlap = (num_rows - window_size) % (y_len)
     print("truncated by:", overlap)
-    if overlap != 0:
-        data = data[overlap:]
 
+    return overlap + sample_freq * np.arange(
+        (num_rows - overlap - window_size - y_len) // (sample_freq + 1))
 
-    X_idx_start = sample_freq * np.arange(
-        (data.shape[0] - window_size - y_len) // (sample_freq + 1))
 
-    X_idx = np.arange(window_size)[None, :] + X_idx_start[:, None]
+def sliding_window(data: np.ndarray, cnf_data: dict, return_indices: bool = False):
+    window_size = cnf_data['window_size']
+    y_len = cnf_data['y_len']
+    sample_freq = cnf_data['sample_freq']
+
+    X_idx_start = window_starts(data.shape[0], cnf_data)
+    num_windows = len(X_idx_start)
+    offset = X_idx_start[0] if num_windows else 0
 
-    X = data[X_idx]
+    # read-only strided views over data, the windows overlap so they must be copied
+    # before being modified
+    X = sliding_window_view(data[offset:], window_size, axis=0)
+    X = X[::sample_freq][:num_windows].transpose(0, 2, 1)
 
     y_idx_start = X_idx_start + window_size
-    y_idx = np.arange(y_len)[None, :] + y_idx_start[:, None]
-    y = data[y_idx]
+    y = sliding_window_view(data[offset + window_size:], y_len, axis=0)
+    y = y[::sample_freq][:num_windows].transpose(0, 2, 1)
 
-    # print("before fft \n", X[0, :, 0])
-    # x_b = X[0, :, 0]
     if cnf_data['fft']:
-        X, avg_k = get_k_fft_by_percentage_energy_above_mean(X, cnf_data['energy'], False)
-    #     print(X.shape)
-    #     print(avg_k)
-    # print("after fft \n", X[0, :, 0])
-    # plt.plot(x_b)
-    # plt.plot(X[0, :, 0])
-    # plt.show()
-    # return
+        X, avg_k = truncate_fft_batched(X, cnf_data['energy'], **fft_options(cnf_data))
 
     if return_indices:
         return X, y, y_idx_start
@@ -91,9 +108,81 @@ def sliding_window(data: np.ndarray, cnf_data: dict, return_indices: bool = Fals
     return X, y
 
 
-def create_dataloader(X, y, batch_size):
-    X = torch.from_numpy(X).float()
-    y = torch.from_numpy(y).float()
+def create_lazy_dataloaders(data: pd.DataFrame, cnf: dict):
+    """Creates the training and testing data loaders without materialising the windows,
+    they are sliced from the series when the batches are loaded
+    """
+    if cnf['type'] == 'distribution':
+        cnf['data']['y_cols'] = ['mean', 'std_dev']
+    y_col_idxs = [data.columns.get_loc(col) for col in cnf['data']['y_cols']]
+
+    series = torch.from_numpy(data.to_numpy(dtype=np.float32))
+    starts = window_starts(series.shape[0], cnf['data'])
+    print("windows:", len(starts))
+
+    # the FFT truncation is done batch by batch while loading the data
+    collate_fn = None
+    if cnf['data']['fft']:
+        collate_fn = FFTTruncationCollate(cnf['data']['energy'],
+                                          fft_options(cnf['data'])['dtype'])
+
+    cnf['model']['input_size'] = series.shape[1]
+
+    train_len = int(len(starts) * cnf['data']['train_prop'])
+    options = loader_options(cnf['data'])
+    loaders = []
+    for split_starts, shuffle in ((starts[:train_len], cnf['data'].get('shuffle', False)),
+                                  (starts[train_len:], False)):
+        dataset = SlidingWindowData(series, split_starts, cnf['data']['window_size'],
+                                    cnf['data']['y_len'], y_col_idxs)
+        # the batches are the same as the ones of the windows in memory, only their order
+        # is shuffled
+        sampler = ContiguousBatchSampler(len(dataset), cnf['data']['batch_size'],
+                                         shuffle=shuffle, indices=True)
+        loaders.append(du.DataLoader(dataset=dataset, batch_sampler=sampler,
+                                     collate_fn=collate_fn, **options))
+    return tuple(loaders)
+
+
+def generate_dataloaders(cnf: dict):
+    """Returns the training and testing data loaders and the normalizers fitted on the data"""
+    if cnf['data'].get('lazy_windows'):
+        data, normalizers = read_dataframe(cnf)
+        return create_lazy_dataloaders(data, cnf) + (normalizers,)
+    X_train, X_test, y_train, y_test, normalizers = generate_data(cnf, return_normalizers=True)
+    return create_dataloaders(X_train, y_train, X_test, y_test, cnf) + (normalizers,)
+
+
+def to_tensor(array: np.ndarray) -> torch.Tensor:
+    """float32 tensor of an array, the read-only windows are copied as the tensor can
+    be written to
+    """
+    array = np.asarray(array, dtype=np.float32)
+    if not array.flags.writeable:
+        array = array.copy()
+    return torch.from_numpy(array)
+
+
+def create_dataloader(X, y, batch_size, shuffle=False, pin_memory=False):
+    X = to_tensor(X)
+    y = to_tensor(y)
     data = TimeSeriesData(X, y)
-    dataloader = du.DataLoader(dataset=data, batch_size=batch_size)
+    # the tensors are in memory, every batch is a slice of them instead of a collation of items
+    sampler = ContiguousBatchSampler(len(data), batch_size, shuffle=shuffle)
+    dataloader = du.DataLoader(dataset=data, batch_size=None, sampler=sampler,
+                               pin_memory=pin_memory)
     return dataloader
+
+
+def ordered_dataloader(dataloader):
+    """Loader over the same dataset in order, without shuffling or dropping batches"""
+    if isinstance(dataloader.sampler, ContiguousBatchSampler):
+        sampler = ContiguousBatchSampler(dataloader.sampler.length, dataloader.sampler.batch_size)
+        return du.DataLoader(dataset=dataloader.dataset, batch_size=None, sampler=sampler)
+    if isinstance(dataloader.batch_sampler, ContiguousBatchSampler):
+        sampler = ContiguousBatchSampler(dataloader.batch_sampler.length,
+                                         dataloader.batch_sampler.batch_size, indices=True)
+        return du.DataLoader(dataset=dataloader.dataset, batch_sampler=sampler,
+                             collate_fn=dataloader.collate_fn)
+    return du.DataLoader(dataset=dataloader.dataset, batch_size=dataloader.batch_size,
+                         collate_fn=dataloader.collate_fn)
@@ -1,24 +1,64 @@
-from typing import Tuple, List
-import datetime as dt
+from typing import Tuple, Iterator
 
 import numpy as np
+from numpy.lib.stride_tricks import sliding_window_view
 import torch
 
-from .data_reader import read_data
-from .to_pandas import convert_to_dataframe
-from .generate_data import sliding_window
+from .data_reader import read_dataframe
+from .generate_data import window_starts
+from .fft_truncation import get_k_fft_by_percentage_energy_above_mean, fft_options
 
 
+def iter_windows(data: np.ndarray, cnf_data: dict,
+                 batch_size: int) -> Iterator[Tuple[np.ndarray, np.ndarray]]:
+    """Yields the windows built by ``sliding_window`` in batches of ``batch_size``,
+    FFT-truncated batch by batch, with the index of the row following every window
+    """
+    window_size = cnf_data['window_size']
+    starts = window_starts(data.shape[0], cnf_data)
+    windows = sliding_window_view(data, window_size, axis=0).transpose(0, 2, 1)
+    dtype = fft_options(cnf_data)['dtype']
+    for i in range(0, len(starts), batch_size):
+        batch_starts = starts[i:i + batch_size]
+        X = windows[batch_starts]
+        if cnf_data['fft']:
+            X, _avg_k = get_k_fft_by_percentage_energy_above_mean(X.astype(dtype, copy=False),
+                                                                  cnf_data['energy'])
+        yield X, batch_starts + window_size
 
-def predict_prices(cnf, model) -> Tuple[List[dt.datetime], List[np.ndarray]]:
-    eth_price, gas_price = read_data(cnf)
-    data, normalizers = convert_to_dataframe(eth_price, gas_price, cnf)
-    data_array = data.to_numpy()
-    X, _y, indices = sliding_window(data_array, cnf['data'], return_indices=True)
-    timestamps = [v.to_pydatetime() for v in data.iloc[indices].index.tolist()]
-    X = torch.from_numpy(X).float()
-    with torch.no_grad():
-        normalized_predictions = model(X).numpy()
+
+def iter_predictions(cnf, model, normalizers: dict = None,
+                     batch_size: int = None) -> Iterator[Tuple[np.ndarray, np.ndarray]]:
+    """Predicts the prices over the configured dates batch by batch, so that only
+    ``batch_size`` windows are in memory at once. The features are scaled with the
+    ``normalizers`` the model was trained with when given.
+    Yields the times of the predictions, as int64 nanoseconds since the epoch of the
+    naive local times of the data, and the unscaled predictions of shape (batch, pred_steps)
+    """
+    if batch_size is None:
+        batch_size = cnf['data'].get('inference_batch_size', 1024)
+    data, normalizers = read_dataframe(cnf, normalizers)
+    times = data.index.asi8
     normalizer = normalizers[cnf['data']['y_cols'][0]]
-    predictions = normalizer.inverse_transform(normalized_predictions)
-    return timestamps, predictions
+    model.eval()
+    with torch.inference_mode():
+        for X, indices in iter_windows(data.to_numpy(), cnf['data'], batch_size):
+            normalized_predictions = model(torch.from_numpy(X).float()).numpy()
+            predictions = normalizer.inverse_transform(normalized_predictions)
+            yield times[indices], np.asarray(predictions).reshape(len(indices), -1)
+
+
+def predict_prices(cnf, model, normalizers: dict = None,
+                   batch_size: int = None) -> Tuple[np.ndarray, np.ndarray]:
+    """Collects ``iter_predictions`` into contiguous arrays: the int64 times of the
+    predictions and the predictions, of shape (N, pred_steps)
+    """
+    timestamps = []
+    predictions = []
+    batches = iter_predictions(cnf, model, normalizers, batch_size)
+    for batch_timestamps, batch_predictions in batches:
+        timestamps.append(batch_timestamps)
+        predictions.append(batch_predictions)
+    if not timestamps:
+        return np.zeros(0, dtype=np.int64), np.zeros((0, cnf['data']['y_len']))
+    return np.concatenate(timestamps), np.ascontiguousarray(np.concatenate(predictions))
@@ -0,0 +1,111 @@
+import json
+import zlib
+import gzip as gz
+from os import path
+import datetime as dt
+
+import numpy as np
+
+
+INDEX_SUFFIX = '.idx.npz'
+
+
+def get_index_path(gas_price_file: str) -> str:
+    return gas_price_file + INDEX_SUFFIX
+
+
+class GasPriceIndex:
+    """Index of a gas price JSONL file written as independent gzip members,
+    similar to BGZF. Every member can be decompressed on its own so only the members
+    overlapping a time range have to be read.
+
+    Args:
+        offsets: Byte offset of every member, followed by the file size
+        timestamps: Minimum and maximum timestamp of every member
+        block_numbers: Minimum and maximum block number of every member
+    """
+    def __init__(self, offsets: np.ndarray, timestamps: np.ndarray, block_numbers: np.ndarray):
+        self.offsets = offsets
+        self.timestamps = timestamps
+        self.block_numbers = block_numbers
+
+    def __len__(self):
+        return len(self.offsets) - 1
+
+    @classmethod
+    def load(cls, index_path: str) -> 'GasPriceIndex':
+        with np.load(index_path) as index:
+            return cls(index['offsets'], index['timestamps'], index['block_numbers'])
+
+    def save(self, index_path: str):
+        with open(index_path, 'wb') as f:
+            np.savez(f, offsets=self.offsets, timestamps=self.timestamps,
+                     block_numbers=self.block_numbers)
+
+    def members_between(self, start_timestamp: float, end_timestamp: float) -> np.ndarray:
+        """Returns the members, in file order, containing timestamps in the given range"""
+        mask = (self.timestamps[:, 1] >= start_timestamp) & (self.timestamps[:, 0] <= end_timestamp)
+        return np.flatnonzero(mask)
+
+    def iter_lines(self, gas_price_file: str, members):
+        """Decompresses only the given members and yields their lines"""
+        with open(gas_price_file, 'rb') as f:
+            for member in members:
+                start, end = self.offsets[member], self.offsets[member + 1]
+                f.seek(start)
+                data = zlib.decompress(f.read(end - start), wbits=31)
+                yield from data.splitlines()
+
+
+def has_gas_price_index(gas_price_file: str) -> bool:
+    return gas_price_file is not None and path.exists(get_index_path(gas_price_file))
+
+
+def build_index(gas_price_file: str, indexed_file: str, lines_per_member: int = 2000):
+    """Rewrites the gzip compressed JSONL file as a sequence of gzip members
+    of ``lines_per_member`` lines and writes the index next to it.
+    The output is still a valid gzip file which can be read with ``gzip.open``
+    """
+    offsets = [0]
+    timestamps = []
+    block_numbers = []
+
+    def flush(out, lines):
+        times = []
+        blocks = []
+        for line in lines:
+            current = json.loads(line)
+            if 'timestamp' in current:
+                times.append(current['timestamp'])
+            if 'block_number' in current:
+                blocks.append(current['block_number'])
+        out.write(gz.compress(b''.join(lines), compresslevel=6))
+        offsets.append(out.tell())
+        timestamps.append((min(times), max(times)) if times else (np.inf, -np.inf))
+        block_numbers.append((min(blocks), max(blocks)) if blocks else (np.iinfo(np.int64).max, -1))
+
+    with gz.open(gas_price_file, 'r') as f, open(indexed_file, 'wb') as out:
+        lines = []
+        for line in f:
+            lines.append(line)
+            if len(lines) >= lines_per_member:
+                flush(out, lines)
+                lines = []
+        if lines:
+            flush(out, lines)
+
+    index = GasPriceIndex(np.array(offsets, dtype=np.int64),
+                          np.array(timestamps, dtype=np.float64).reshape(-1, 2),
+                          np.array(block_numbers, dtype=np.int64).reshape(-1, 2))
+    index.save(get_index_path(indexed_file))
+    return index
+
+
+def index_data(cnf: dict):
+    gas_price_file = cnf['data']['gas_price_file']
+    indexed_file = cnf['data']['indexed_gas_price_file']
+    start = dt.datetime.now()
+    index = build_index(gas_price_file, indexed_file,
+                        cnf['data'].get('index_lines_per_member', 2000))
+    print("Indexed {0} gzip members to {1} in {2}".format(
+        len(index), indexed_file, dt.datetime.now() - start))
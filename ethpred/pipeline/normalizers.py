@@ -1,4 +1,14 @@
+import json
+
 import numpy as np
+import pandas as pd
+import torch
+
+from .outliers import OutlierFilter
+
+
+# file name of the fitted normalizers saved next to a model or a dataset
+NORMALIZERS_FILE = 'normalizers.json'
 
 
 class MinMaxNormalizer:
@@ -23,8 +33,9 @@ class MinMaxNormalizer:
         self._max_value = np.max(array)
 
     def transform(self, array):
+        """Works on pandas objects, numpy arrays and torch tensors"""
         result = (array - self.min_value) / (self.max_value - self.min_value)
-        return result.fillna(0)
+        return _fill_nan(result)
 
     def fit_transform(self, array):
         self.fit(array)
@@ -33,6 +44,95 @@ class MinMaxNormalizer:
     def inverse_transform(self, array):
         return array * (self.max_value - self.min_value) + self.min_value
 
+    def to_dict(self):
+        return dict(name='minmax', min_value=float(self.min_value),
+                    max_value=float(self.max_value))
+
+    @classmethod
+    def from_dict(cls, params):
+        normalizer = cls()
+        normalizer._min_value = params['min_value']
+        normalizer._max_value = params['max_value']
+        return normalizer
+
+
+def decayed_max(values: np.ndarray, decay: float, initial: float) -> float:
+    """Final value of ``h = max(x, decay * h + (1 - decay) * x)`` over the values,
+    starting from ``initial``, without a loop over the values.
+
+    Every step is ``h = decay * max(h, x) + (1 - decay) * x``, so after n values
+    ``h = B_n + decay ** n * max(initial, max_k(decay ** -k * (x_k - B_k)))`` where
+    ``B`` is the exponential moving average of the values started at 0. The values are
+    processed by chunks short enough for ``decay ** -k`` not to overflow.
+    """
+    if decay <= 0:
+        return float(values[-1])
+    if decay >= 1:
+        return float(max(initial, values.max()))
+    size = max(1, int(300 / -np.log(decay)))
+    high = initial
+    for start in range(0, len(values), size):
+        chunk = values[start:start + size]
+        weights = decay ** -np.arange(1, len(chunk) + 1, dtype=np.float64)
+        averages = (1 - decay) * np.cumsum(weights * chunk) / weights
+        high = averages[-1] + np.max(np.maximum(weights * (chunk - averages), high)) / weights[-1]
+    return float(high)
+
+
+class StreamingMinMaxNormalizer(MinMaxNormalizer):
+    """Min-max normalizer updated incrementally with ``partial_fit``
+
+    With a ``decay`` below 1 the extrema are exponentially pulled towards the new values,
+    so that old spikes are forgotten: ``max = max(x, decay * max + (1 - decay) * x)``.
+    Once frozen, e.g. for serving, the extrema seen in training are not updated anymore.
+
+    Args:
+        decay: Decay applied to the extrema for every new value, None to keep the exact extrema
+        frozen: Whether partial_fit should leave the extrema unchanged
+    """
+    def __init__(self, decay: float = None, frozen: bool = False):
+        super().__init__()
+        self.decay = decay
+        self.frozen = frozen
+
+    def fit(self, array):
+        self._min_value = None
+        self._max_value = None
+        self.partial_fit(array)
+
+    def partial_fit(self, array):
+        if self.frozen:
+            return
+        values = np.asarray(array, dtype=np.float64).reshape(-1)
+        values = values[~np.isnan(values)]
+        if len(values) == 0:
+            return
+        if self.decay is None:
+            low, high = values.min(), values.max()
+            self._min_value = low if self._min_value is None else min(self._min_value, low)
+            self._max_value = high if self._max_value is None else max(self._max_value, high)
+            return
+        # the decay makes every value depend on the previous extrema
+        low = values[0] if self._min_value is None else self._min_value
+        high = values[0] if self._max_value is None else self._max_value
+        self._min_value = -decayed_max(-values, self.decay, -low)
+        self._max_value = decayed_max(values, self.decay, high)
+
+    def freeze(self):
+        self.frozen = True
+
+    def to_dict(self):
+        params = super().to_dict()
+        params.update(name='streaming_minmax', decay=self.decay, frozen=self.frozen)
+        return params
+
+    @classmethod
+    def from_dict(cls, params):
+        normalizer = cls(params['decay'], params['frozen'])
+        normalizer._min_value = params['min_value']
+        normalizer._max_value = params['max_value']
+        return normalizer
+
 
 class LogNormalizer:
     def fit(self, array):
@@ -43,16 +143,65 @@ class LogNormalizer:
         return self.transform(array)
 
     def transform(self, array):
+        if isinstance(array, torch.Tensor):
+            col = torch.log(array)
+            return col.masked_fill(torch.isneginf(col), 0)
         col = np.log(array)
         col[np.isneginf(col)] = 0
         return col
 
     def inverse_transform(self, array):
+        if isinstance(array, torch.Tensor):
+            return torch.exp(array)
         return np.exp(array)
 
+    def to_dict(self):
+        return dict(name='log')
+
+    @classmethod
+    def from_dict(cls, params):
+        return cls()
+
+
+NORMALIZERS = dict(
+    log=LogNormalizer,
+    minmax=MinMaxNormalizer,
+    streaming_minmax=StreamingMinMaxNormalizer,
+)
+
+
+def _fill_nan(result):
+    if isinstance(result, (pd.Series, pd.DataFrame)):
+        return result.fillna(0)
+    if isinstance(result, torch.Tensor):
+        return result.masked_fill(torch.isnan(result), 0)
+    return np.where(np.isnan(result), 0, result)
+
+
+def create(name, **kwargs):
+    return NORMALIZERS[name](**kwargs)
+
+
+def load(params):
+    """Creates a fitted normalizer from the output of its ``to_dict``"""
+    if params['name'] == 'outlier_filter':
+        return OutlierFilter.from_dict(params)
+    return NORMALIZERS[params['name']].from_dict(params)
+
+
+def dump_normalizers(normalizers: dict, filename: str):
+    """Writes the fitted normalizer of every column as JSON"""
+    with open(filename, 'w') as f:
+        json.dump({k: v.to_dict() for k, v in normalizers.items()}, f, indent=2)
+
 
-def create(name):
-    return dict(
-        log=LogNormalizer,
-        minmax=MinMaxNormalizer,
-    )[name]()
+def load_normalizers(filename: str, frozen: bool = False) -> dict:
+    """Loads the normalizers written by ``dump_normalizers``, with ``frozen`` the streaming
+    normalizers and outlier filter keep the statistics they were saved with"""
+    with open(filename) as f:
+        loaded = {k: load(v) for k, v in json.load(f).items()}
+    if frozen:
+        for normalizer in loaded.values():
+            if hasattr(normalizer, 'freeze'):
+                normalizer.freeze()
+    return loaded
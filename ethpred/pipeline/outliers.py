@@ -0,0 +1,87 @@
+import numpy as np
+import pandas as pd
+
+
+# key of the fitted outlier filter among the normalizers, so that it is saved with them
+OUTLIER_FILTER_KEY = '__outlier_filter__'
+
+
+class RunningStats:
+    """Running mean and sample standard deviation (Welford), updated by batches
+    using the parallel combination of Chan et al.
+    """
+    def __init__(self, count: int = 0, mean: float = 0.0, m2: float = 0.0):
+        self.count = count
+        self.mean = mean
+        self.m2 = m2
+
+    @property
+    def std(self) -> float:
+        if self.count < 2:
+            return np.nan
+        return np.sqrt(self.m2 / (self.count - 1))
+
+    def update(self, values):
+        values = np.asarray(values, dtype=np.float64).reshape(-1)
+        values = values[~np.isnan(values)]
+        if len(values) == 0:
+            return
+        count = len(values)
+        mean = values.mean()
+        m2 = np.sum((values - mean) ** 2)
+        total = self.count + count
+        delta = mean - self.mean
+        self.mean += delta * count / total
+        self.m2 += m2 + delta ** 2 * self.count * count / total
+        self.count = total
+
+    def to_dict(self):
+        return dict(count=self.count, mean=float(self.mean), m2=float(self.m2))
+
+    @classmethod
+    def from_dict(cls, params):
+        return cls(params['count'], params['mean'], params['m2'])
+
+
+class OutlierFilter:
+    """Streaming version of ``remove_outliers``: the rows further than ``threshold``
+    standard deviations from the running mean of a column are removed.
+    The statistics are updated with every new batch of rows unless frozen, so a new
+    block only costs O(1) instead of recomputing the statistics of the whole history.
+
+    Args:
+        columns: The columns to filter, in order
+        threshold: Maximum distance to the mean, in standard deviations
+        frozen: Whether the statistics should be left unchanged by new rows
+    """
+    def __init__(self, columns, threshold: float = 1.5, frozen: bool = False):
+        self.columns = list(columns)
+        self.threshold = threshold
+        self.frozen = frozen
+        self.stats = {v: RunningStats() for v in self.columns}
+
+    def freeze(self):
+        self.frozen = True
+
+    def filter(self, data: pd.DataFrame) -> pd.DataFrame:
+        for column in self.columns:
+            if column not in data:
+                continue
+            stats = self.stats[column]
+            if not self.frozen:
+                stats.update(data[column].to_numpy())
+            # the standard deviation is undefined until two values are seen
+            if stats.count < 2:
+                continue
+            data = data[(data[column] - stats.mean).abs() <= self.threshold * stats.std]
+        return data
+
+    def to_dict(self):
+        return dict(name='outlier_filter', columns=self.columns, threshold=self.threshold,
+                    frozen=self.frozen, stats={k: v.to_dict() for k, v in self.stats.items()})
+
+    @classmethod
+    def from_dict(cls, params):
+        outlier_filter = cls(params['columns'], params['threshold'], params['frozen'])
+        outlier_filter.stats = {k: RunningStats.from_dict(v) for k, v in params['stats'].items()}
+        return outlier_filter
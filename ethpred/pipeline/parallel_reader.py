@@ -0,0 +1,111 @@
+import gzip as gz
+import zlib
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+from datetime import datetime
+
+try:
+    import orjson as json_parser
+except ImportError:
+    import json as json_parser
+
+from .block_store import BlockColumns, BlockColumnsBuilder, sort_by_timestamp
+from .jsonl_index import GasPriceIndex, get_index_path, has_gas_price_index
+
+
+DEFAULT_CHUNK_LINES = 2000
+
+
+def parse_lines(lines, with_transactions: bool) -> BlockColumns:
+    builder = BlockColumnsBuilder(with_transactions)
+    for line in lines:
+        if line.strip():
+            builder.add(json_parser.loads(line))
+    return builder.build()
+
+
+def _parse_chunk(chunk: bytes, with_transactions: bool) -> BlockColumns:
+    return parse_lines(chunk.splitlines(), with_transactions)
+
+
+def _parse_members(gas_price_file: str, ranges: list, with_transactions: bool) -> BlockColumns:
+    parts = []
+    with open(gas_price_file, 'rb') as f:
+        for start, end in ranges:
+            f.seek(start)
+            data = zlib.decompress(f.read(end - start), wbits=31)
+            parts.append(parse_lines(data.splitlines(), with_transactions))
+    return sort_by_timestamp(BlockColumns.concatenate(parts[::-1]))
+
+
+def read_block_columns(cnf: dict, start_time: datetime, end_time: datetime) -> BlockColumns:
+    """Decodes the gas price file in a pool of ``data.reader_workers`` processes
+
+    When the file has been indexed, every worker inflates its own gzip members,
+    otherwise the main process inflates the file and hands out chunks of lines
+    """
+    workers = cnf['data']['reader_workers']
+    chunk_lines = cnf['data'].get('reader_chunk_lines', DEFAULT_CHUNK_LINES)
+    with_transactions = cnf['type'] == 'distribution'
+    start_timestamp, end_timestamp = start_time.timestamp(), end_time.timestamp()
+
+    indexed_file = cnf['data'].get('indexed_gas_price_file')
+    with ProcessPoolExecutor(max_workers=workers) as executor:
+        if has_gas_price_index(indexed_file):
+            parts = _read_indexed(executor, indexed_file, workers, with_transactions,
+                                  start_timestamp, end_timestamp)
+        else:
+            parts = _read_stream(executor, cnf['data']['gas_price_file'], workers, chunk_lines,
+                                 with_transactions, start_timestamp)
+
+    # the parts are in file order, i.e. newest first
+    blocks = sort_by_timestamp(BlockColumns.concatenate(parts[::-1]))
+    return blocks.between(start_timestamp, end_timestamp)
+
+
+def _read_indexed(executor, indexed_file, workers, with_transactions,
+                  start_timestamp, end_timestamp):
+    index = GasPriceIndex.load(get_index_path(indexed_file))
+    members = index.members_between(start_timestamp, end_timestamp)
+    ranges = [(index.offsets[v], index.offsets[v + 1]) for v in members]
+    # a few tasks per worker to balance the load
+    task_size = max(1, len(ranges) // (4 * workers))
+    futures = [executor.submit(_parse_members, indexed_file, ranges[i:i + task_size],
+                               with_transactions)
+               for i in range(0, len(ranges), task_size)]
+    return [v.result() for v in futures]
+
+
+def _read_stream(executor, gas_price_file, workers, chunk_lines, with_transactions,
+                 start_timestamp):
+    parts = []
+    pending = deque()
+    done = False
+
+    def collect():
+        nonlocal done
+        part = pending.popleft().result()
+        parts.append(part)
+        # the file is newest first, nothing after this chunk is needed
+        if len(part) and part['timestamp'][0] < start_timestamp:
+            done = True
+
+    with gz.open(gas_price_file, 'r') as f:
+        lines = []
+        for line in f:
+            lines.append(line)
+            if len(lines) >= chunk_lines:
+                pending.append(executor.submit(_parse_chunk, b''.join(lines), with_transactions))
+                lines = []
+                if len(pending) >= 2 * workers:
+                    collect()
+                if done:
+                    break
+        if lines and not done:
+            pending.append(executor.submit(_parse_chunk, b''.join(lines), with_transactions))
+
+    while pending and not done:
+        collect()
+    for future in pending:
+        future.cancel()
+    return parts
@@ -0,0 +1,109 @@
+import numpy as np
+import pandas as pd
+from pandas.tseries.frequencies import to_offset
+
+
+class Resampler:
+    """Incremental equivalent of ``data.resample(freq).mean().fillna(method='pad')``
+
+    The rows are fed in time order with ``update``, which keeps the running sums and
+    counts of the bucket still open and returns the buckets closed by the new rows,
+    empty buckets being forward filled. ``flush`` closes the last bucket.
+    The buckets are aligned on the midnight of the first row as pandas does.
+
+    Args:
+        freq: Width of the buckets, e.g. ``5T``
+        columns: Names of the columns of the rows
+    """
+    def __init__(self, freq: str, columns):
+        self.freq = to_offset(freq)
+        self.width = self.freq.nanos
+        self.columns = list(columns)
+        self.origin = None
+        # bucket currently open, with the sums and counts of its non missing values
+        self.bucket = None
+        self.sums = np.zeros(len(self.columns))
+        self.counts = np.zeros(len(self.columns), dtype=np.int64)
+        # last values emitted for every column, used to forward fill
+        self.last_values = np.full(len(self.columns), np.nan)
+        self.last_emitted = None
+        self.empty = pd.DataFrame(np.zeros((0, len(self.columns))), columns=self.columns,
+                                  index=pd.DatetimeIndex([], dtype='datetime64[ns]'))
+
+    def update(self, times, values) -> pd.DataFrame:
+        """Adds rows in time order and returns the buckets closed by them
+        :param times: Times of the rows, datetime64 values
+        :param values: Values of the rows, of shape (rows, columns)
+        """
+        times = np.asarray(times, dtype='datetime64[ns]').view(np.int64)
+        values = np.asarray(values, dtype=np.float64).reshape(len(times), len(self.columns))
+        if len(times) == 0:
+            return self.empty
+        if self.origin is None:
+            self.origin = times[0] - times[0] % (24 * 3600 * 10 ** 9)
+            self.bucket = (times[0] - self.origin) // self.width
+        buckets = (times - self.origin) // self.width
+        if np.any(np.diff(buckets) < 0) or buckets[0] < self.bucket:
+            raise ValueError("the rows must be added in time order")
+
+        valid = ~np.isnan(values)
+        if buckets[-1] == self.bucket:
+            # usual case of a live feed, the rows all go to the open bucket
+            self.sums = self.sums + np.where(valid, values, 0).sum(axis=0)
+            self.counts = self.counts + valid.sum(axis=0)
+            return self.empty
+
+        # sums and counts of every bucket of the rows, the open bucket first
+        starts = np.flatnonzero(np.r_[True, buckets[1:] != buckets[:-1]])
+        ids = np.r_[self.bucket, buckets[starts]]
+        sums = np.vstack([self.sums, np.add.reduceat(np.where(valid, values, 0), starts, axis=0)])
+        counts = np.vstack([self.counts, np.add.reduceat(valid, starts, axis=0)])
+        if ids[1] == ids[0]:
+            sums[1] += sums[0]
+            counts[1] += counts[0]
+            ids, sums, counts = ids[1:], sums[1:], counts[1:]
+
+        # the last bucket can still receive rows
+        self.bucket, self.sums, self.counts = ids[-1], sums[-1], counts[-1]
+        return self._emit(ids[:-1], self._means(sums[:-1], counts[:-1]))
+
+    def flush(self) -> pd.DataFrame:
+        """Closes the open bucket and returns it"""
+        if self.bucket is None or (self.last_emitted is not None and
+                                   self.bucket <= self.last_emitted):
+            return self.empty
+        return self._emit(np.array([self.bucket]), self._means(self.sums[None], self.counts[None]))
+
+    def resample(self, data: pd.DataFrame) -> pd.DataFrame:
+        """Resamples a whole frame indexed by time in one go"""
+        closed = self.update(data.index.to_numpy(), data.to_numpy(dtype=np.float64))
+        result = pd.concat([closed, self.flush()])
+        result.index = pd.DatetimeIndex(result.index, freq=self.freq, name=data.index.name)
+        return result
+
+    @staticmethod
+    def _means(sums: np.ndarray, counts: np.ndarray) -> np.ndarray:
+        with np.errstate(invalid='ignore', divide='ignore'):
+            return np.where(counts > 0, sums / np.maximum(counts, 1), np.nan)
+
+    def _emit(self, ids: np.ndarray, means: np.ndarray) -> pd.DataFrame:
+        if len(ids) == 0:
+            return self.empty
+        # dense range of buckets, the empty ones are missing
+        first = ids[0] if self.last_emitted is None else self.last_emitted + 1
+        dense = np.full((ids[-1] - first + 1, len(self.columns)), np.nan)
+        dense[ids - first] = means
+        dense = forward_fill(dense, self.last_values)
+        self.last_values = dense[-1]
+        self.last_emitted = ids[-1]
+        index = pd.DatetimeIndex(self.origin + (first + np.arange(len(dense))) * self.width)
+        return pd.DataFrame(dense, index=index, columns=self.columns)
+
+
+def forward_fill(values: np.ndarray, initial: np.ndarray) -> np.ndarray:
+    """Replaces the missing values by the last value above them, or by ``initial``"""
+    values = np.vstack([initial[None], values])
+    valid = ~np.isnan(values)
+    idx = np.where(valid, np.arange(len(values))[:, None], 0)
+    np.maximum.accumulate(idx, axis=0, out=idx)
+    return np.take_along_axis(values, idx, axis=0)[1:]
@@ -0,0 +1,101 @@
+import json
+import os
+from os import path
+
+import numpy as np
+import pandas as pd
+
+from .normalizers import NORMALIZERS_FILE, dump_normalizers, load_normalizers
+
+
+MANIFEST_FILE = 'manifest.json'
+TENSOR_VERSION = 1
+
+# keys of the data configuration the windows are built with
+WINDOW_KEYS = ('window_size', 'y_len', 'sample_freq', 'train_prop', 'fft', 'energy', 'fft_dtype')
+
+
+def window_config(cnf: dict) -> dict:
+    window_cnf = {k: cnf['data'].get(k) for k in WINDOW_KEYS}
+    window_cnf['type'] = cnf['type']
+    return window_cnf
+
+
+class TensorDataset:
+    """Windowed, FFT-truncated and normalised data written by ``prep_data``
+
+    The arrays are memory-mapped copy-on-write, so the pages are shared by every
+    process training on the same dataset and nothing is read until it is used.
+
+    Args:
+        series: The normalised series, of shape (rows, columns)
+        X: The input windows, of shape (windows, window_size, columns)
+        y: The targets of the windows
+        manifest: Description of the arrays and of how they were built
+        normalizers: The fitted normalizer of every scaled column
+    """
+    def __init__(self, series: np.ndarray, X: np.ndarray, y: np.ndarray, manifest: dict,
+                 normalizers: dict):
+        self.series = series
+        self.X = X
+        self.y = y
+        self.manifest = manifest
+        self.normalizers = normalizers
+
+    @property
+    def train_len(self) -> int:
+        return self.manifest['train_len']
+
+    def frame(self) -> pd.DataFrame:
+        """The normalised series as a DataFrame, without its index"""
+        return pd.DataFrame(self.series, columns=self.manifest['columns'], copy=False)
+
+    def split(self) -> tuple:
+        return (self.X[:self.train_len], self.y[:self.train_len],
+                self.X[self.train_len:], self.y[self.train_len:])
+
+
+def has_tensor_dataset(cnf: dict) -> bool:
+    tensor_path = cnf['data'].get('tensor_path')
+    return tensor_path is not None and path.exists(path.join(tensor_path, MANIFEST_FILE))
+
+
+def write_tensor_dataset(tensor_path: str, data: pd.DataFrame, X: np.ndarray, y: np.ndarray,
+                         normalizers: dict, cnf: dict):
+    os.makedirs(tensor_path, exist_ok=True)
+    np.save(path.join(tensor_path, 'series.npy'), data.to_numpy(dtype=np.float32))
+    np.save(path.join(tensor_path, 'X.npy'), np.ascontiguousarray(X, dtype=np.float32))
+    np.save(path.join(tensor_path, 'y.npy'), np.ascontiguousarray(y, dtype=np.float32))
+    dump_normalizers(normalizers, path.join(tensor_path, NORMALIZERS_FILE))
+    manifest = dict(
+        version=TENSOR_VERSION,
+        columns=list(data.columns),
+        y_cols=list(cnf['data']['y_cols']),
+        start=str(data.index[0]) if len(data) else None,
+        end=str(data.index[-1]) if len(data) else None,
+        windows=X.shape[0],
+        train_len=int(X.shape[0] * cnf['data']['train_prop']),
+        window_config=window_config(cnf),
+    )
+    # written last, the dataset is only picked up once it is complete
+    with open(path.join(tensor_path, MANIFEST_FILE), 'w') as f:
+        json.dump(manifest, f, indent=2)
+
+
+def open_tensor_dataset(tensor_path: str, cnf: dict = None) -> TensorDataset:
+    """Memory-maps the dataset at ``tensor_path``. When ``cnf`` is given, the windows
+    must have been built with the same window configuration
+    """
+    with open(path.join(tensor_path, MANIFEST_FILE)) as f:
+        manifest = json.load(f)
+    if manifest['version'] != TENSOR_VERSION:
+        raise ValueError("unsupported tensor dataset version {0}".format(manifest['version']))
+    if cnf is not None and manifest['window_config'] != window_config(cnf):
+        raise ValueError("the tensor dataset in {0} was built with {1}, re-run prep_data".format(
+            tensor_path, manifest['window_config']))
+    normalizers = load_normalizers(path.join(tensor_path, NORMALIZERS_FILE))
+
+    def load(name):
+        return np.load(path.join(tensor_path, name + '.npy'), mmap_mode='c')
+
+    return TensorDataset(load('series'), load('X'), load('y'), manifest, normalizers)
@@ -1,26 +1,41 @@
-from datetime import datetime
+import fnmatch
 
 import pandas as pd
 import numpy as np
 
-from .calc_distributions import generate_distribution
+from .calc_distributions import generate_segment_distributions, generate_transaction_summary
+from .block_store import BlockColumns, local_datetime_index
 from . import normalizers
+from .outliers import OutlierFilter, OUTLIER_FILTER_KEY
+from .resampling import Resampler
 
 
-def convert_to_dataframe(eth_prices: dict, gas_price: list, cnf: dict):
+def convert_to_dataframe(eth_prices: dict, gas_price: list, cnf: dict, data_normalizers=None,
+                         outlier_filter=None):
+    """Builds the normalised frame, the columns are scaled with ``data_normalizers``
+    and the outliers removed with the running statistics of ``outlier_filter`` when given.
+    With ``scaling.outlier_filter: streaming`` the filter fitted with the normalizers is
+    used, or a new one is created, and it is returned among the normalizers
+    """
     features = cnf['data']['features']
     nested_features = cnf['data']['nested_features']
 
-    gas_price_dict = parse_gas_price_data(cnf, features, gas_price, nested_features)
+    if isinstance(gas_price, BlockColumns):
+        gas_price_columns = parse_block_columns(cnf, features, gas_price, nested_features)
+    else:
+        gas_price_columns = parse_gas_price_data(cnf, features, gas_price, nested_features)
+    gas_price_df = pd.DataFrame(gas_price_columns)
 
-    data = join_datasets(cnf, eth_prices, gas_price_dict)
+    data = join_datasets(cnf, eth_prices, gas_price_df)
 
 
     print("before resampling: \n", data.head())
 
     data = resample_data(data, cnf)
 
-    data, data_normalizers = normalise_data(data, cnf)
+    if outlier_filter is None:
+        outlier_filter = get_outlier_filter(cnf, data_normalizers)
+    data, data_normalizers = normalise_data(data, cnf, data_normalizers, outlier_filter)
 
     print(data[data.isna().any(axis=1)])
 
@@ -31,80 +46,162 @@ def convert_to_dataframe(eth_prices: dict, gas_price: list, cnf: dict):
 
 def resample_data(data: pd.DataFrame, cnf: dict):
     if cnf['data']['resample']:
-        data = data.resample(cnf['data']['resample']).mean()
-        data = data.fillna(method='pad')
+        # same as data.resample(...).mean().fillna(method='pad')
+        data = Resampler(cnf['data']['resample'], data.columns).resample(data)
     return data
 
 
 def parse_gas_price_data(cnf, features, gas_price, nested_features):
-    gas_price_dict = {}
-    for obs in range(len(gas_price)):
-        gas_price_dict[obs] = {}
-        for feature in features:
-            if feature in gas_price[obs]:
-                gas_price_dict[obs][feature] = gas_price[obs][feature]
-            else:
-                gas_price_dict[obs][feature] = None
-        if 'timestamp' in gas_price[obs]:
-            gas_price_dict[obs]['time'] = datetime.fromtimestamp(gas_price[obs]['timestamp'])
-
-        for feature in nested_features:
-            key = list(feature.keys())[0]
-            val = feature[key]
-            if key in gas_price[obs] and val in gas_price[obs][key]:
-                gas_price_dict[obs][key] = gas_price[obs][key][val]
-            else:
-                gas_price_dict[obs][key] = None
-
-        if cnf['type'] == 'distribution' and 'transactions' in gas_price[obs]:
-            gas_price_dict[obs]['mean'], gas_price_dict[obs]['std_dev'] = generate_distribution(
-                gas_price[obs]['transactions'])
-
-            if cnf['data']['inc_transactions']:
-                for i in range(len(gas_price[obs]['transactions'])):
-                    gas_price_dict[obs]['gas_price_' + str(i)] = gas_price[obs]['transactions'][i][
-                        'gas_price']
-    return gas_price_dict
-
-
-def join_datasets(cnf, eth_prices, gas_price_dict):
+    """Builds the columns of the gas price frame from the raw blocks"""
+    columns = {}
+    for feature in features:
+        columns[feature] = _to_column([v.get(feature) for v in gas_price])
+    columns['time'] = local_datetime_index(_to_column([v.get('timestamp') for v in gas_price]))
+
+    for feature in nested_features:
+        key = list(feature.keys())[0]
+        val = feature[key]
+        columns[key] = _to_column([v[key].get(val) if key in v else None for v in gas_price])
+
+    if cnf['type'] == 'distribution':
+        # flatten the transactions once so that the statistics can be computed per segment
+        tx_counts = np.array([len(v.get('transactions', ())) for v in gas_price], dtype=np.int64)
+        tx_offsets = np.zeros(len(gas_price) + 1, dtype=np.int64)
+        np.cumsum(tx_counts, out=tx_offsets[1:])
+        tx_prices = np.fromiter((tx['gas_price'] for v in gas_price
+                                 for tx in v.get('transactions', ())),
+                                dtype=np.float64, count=tx_offsets[-1])
+        columns.update(transaction_columns(cnf, tx_offsets, tx_prices))
+    return columns
+
+
+def parse_block_columns(cnf, features, blocks: BlockColumns, nested_features):
+    columns = {}
+    for feature in features:
+        if feature not in blocks:
+            raise ValueError("feature {0} is not available in the block store".format(feature))
+        columns[feature] = blocks[feature]
+    columns['time'] = local_datetime_index(blocks['timestamp'])
+
+    for feature in nested_features:
+        key = list(feature.keys())[0]
+        val = feature[key]
+        if val != 'gas_price' or key not in blocks:
+            raise ValueError("nested feature {0}.{1} is not available in the block store".format(
+                key, val))
+        columns[key] = blocks[key]
+
+    if cnf['type'] == 'distribution':
+        columns.update(transaction_columns(cnf, blocks.tx_offsets, blocks.tx_prices))
+    return columns
+
+
+def transaction_columns(cnf, tx_offsets: np.ndarray, tx_prices: np.ndarray) -> dict:
+    """Per-block columns derived from the CSR array of transactions gas prices"""
+    columns = {}
+    columns['mean'], columns['std_dev'] = generate_segment_distributions(tx_offsets, tx_prices)
+
+    summary_cnf = cnf['data'].get('transaction_summary')
+    if cnf['data']['inc_transactions'] and summary_cnf:
+        # bounded number of columns whatever the number of transactions in the blocks
+        method = summary_cnf['method']
+        summary = generate_transaction_summary(
+            tx_offsets, tx_prices, method, summary_cnf['size'],
+            **{k: v for k, v in summary_cnf.items() if k in ('min_price', 'max_price')})
+        for i in range(summary_cnf['size']):
+            columns['tx_{0}_{1}'.format(method, i)] = summary[:, i]
+    elif cnf['data']['inc_transactions']:
+        counts = np.diff(tx_offsets)
+        width = int(counts.max()) if len(counts) else 0
+        tx_matrix = np.full((len(counts), width), np.nan)
+        rows = np.repeat(np.arange(len(counts)), counts)
+        slots = np.arange(len(rows)) - np.repeat(tx_offsets[:-1] - tx_offsets[0], counts)
+        tx_matrix[rows, slots] = tx_prices[tx_offsets[0]:tx_offsets[-1]]
+        for i in range(width):
+            columns['gas_price_' + str(i)] = tx_matrix[:, i]
+    return columns
+
+
+def _to_column(values: list) -> np.ndarray:
+    return np.array([np.nan if v is None else v for v in values], dtype=np.float64)
+
+
+def join_datasets(cnf, eth_prices, gas_price_df: pd.DataFrame):
     if isinstance(eth_prices, dict):
         eth_price_df = pd.DataFrame.from_dict(eth_prices)
     elif isinstance(eth_prices, pd.DataFrame):
         eth_price_df = eth_prices
     else:
         raise NotImplementedError
-    eth_price_df['date'] = pd.to_datetime(eth_price_df['date'])
     eth_price_df = eth_price_df[cnf['data']['eth_price_features']]
-    gas_price_df = pd.DataFrame.from_dict(gas_price_dict, orient='index')
+    eth_price_df = eth_price_df.assign(date=pd.to_datetime(eth_price_df['date']))
+    eth_price_df = _sorted_by(eth_price_df.dropna(axis='rows', subset=['date']).fillna(0), 'date')
+    eth_dates = eth_price_df['date'].to_numpy()
+    eth_cols = [v for v in eth_price_df.columns if v != 'date']
 
-    gas_price_df = gas_price_df.dropna(axis='rows', subset=['time']).fillna(0).sort_values(
-        by='time')
-    eth_price_df = eth_price_df.dropna(axis='rows', subset=['date']).fillna(0).sort_values(
-        by='date')
+    gas_price_df = _sorted_by(gas_price_df.dropna(axis='rows', subset=['time']).fillna(0), 'time')
+    times = gas_price_df['time'].to_numpy()
 
-    data = pd.merge_asof(gas_price_df, eth_price_df, left_on='time', right_on='date',
-                         direction='backward')
-    data.set_index('time', inplace=True, drop=False)
+    # only the blocks in the date range are joined, the blocks before are only used for the lags
+    start, stop = np.searchsorted(times, [pd.Timestamp(cnf['data']['start_date']).to_datetime64(),
+                                          pd.Timestamp(cnf['data']['end_date']).to_datetime64()],
+                                  side='right')
+    data = gas_price_df.iloc[start:stop].set_index('time')
 
-    # Add the lagged columns if any
-    lag_cols = cnf['data']['lagged_cols']
-    lagged_data = pd.DataFrame(data[lag_cols], index=data.index)
-    lagged_data = lagged_data.shift(1, freq='D')
-    lagged_data.columns = [i + '_lagged' for i in lag_cols]
+    def eth_values(rows_times):
+        # last tick at or before every time
+        idx = np.searchsorted(eth_dates, rows_times, side='right') - 1
+        return {col: _take(eth_price_df[col].to_numpy(), idx) for col in eth_cols}
 
-    data = pd.merge_asof(data, lagged_data, left_index=True, right_index=True, direction='nearest')
-    data = data[
-        (data['time'] > cnf['data']['start_date']) & (data['time'] <= cnf['data']['end_date'])]
+    data = data.assign(**eth_values(times[start:stop]))
 
-    data = data.drop(columns=['time', 'date'])
+    # Add the lagged columns if any, the value of the block nearest to one day before
+    lag_cols = cnf['data']['lagged_cols']
+    if lag_cols:
+        lag_idx = nearest_index(times, times[start:stop] - np.timedelta64(1, 'D'))
+        lag_eth = eth_values(times[np.maximum(lag_idx, 0)])
+        for col in lag_cols:
+            if col in lag_eth:
+                values = np.where(lag_idx >= 0, lag_eth[col], np.nan)
+            else:
+                values = _take(gas_price_df[col].to_numpy(), lag_idx)
+            data[col + '_lagged'] = values
 
     return data
 
 
+def nearest_index(times: np.ndarray, targets: np.ndarray) -> np.ndarray:
+    """Position of the nearest of the sorted ``times`` to every target, -1 if ``times`` is empty.
+    Ties go to the earlier time, and to the last of equal times, as ``merge_asof``
+    """
+    after = np.searchsorted(times, targets, side='left')
+    before = np.searchsorted(times, targets, side='right') - 1
+    if len(times) == 0:
+        return before
+    after_time = times[np.minimum(after, len(times) - 1)]
+    before_time = times[np.maximum(before, 0)]
+    before_nearer = targets - before_time <= after_time - targets
+    use_before = (after >= len(times)) | ((before >= 0) & before_nearer)
+    return np.where(use_before, before, after)
 
-def scale_array(array, scale_method):
-    normalizer = normalizers.create(scale_method)
+
+def _sorted_by(df: pd.DataFrame, column: str) -> pd.DataFrame:
+    # the inputs are usually already sorted, in which case nothing is copied
+    if df[column].is_monotonic_increasing:
+        return df
+    return df.sort_values(by=column, kind='stable')
+
+
+def _take(values: np.ndarray, idx: np.ndarray) -> np.ndarray:
+    """``values[idx]`` with NaN where ``idx`` is negative"""
+    result = values[np.maximum(idx, 0)].astype(np.float64) if len(values) else \
+        np.full(len(idx), np.nan)
+    result[idx < 0] = np.nan
+    return result
+
+
+def scale_array(array, scale_method, normalizer_args=None):
+    normalizer = normalizers.create(scale_method, **(normalizer_args or {}))
     scaled = normalizer.fit_transform(array)
     return scaled, normalizer
 
@@ -120,14 +217,45 @@ def remove_outliers(data: pd.DataFrame, columns):
     return data
 
 
-def normalise_data(data: pd.DataFrame, cnf):
-    data = remove_outliers(data, cnf['data'].get('remove_outliers', []))
+def create_outlier_filter(cnf) -> OutlierFilter:
+    """Streaming outlier filter over the ``remove_outliers`` columns, to be kept
+    and reused for every new batch of blocks"""
+    return OutlierFilter(cnf['data'].get('remove_outliers', []))
+
+
+def get_outlier_filter(cnf, fitted_normalizers: dict = None):
+    """The fitted streaming outlier filter, a new one when none was fitted yet,
+    or None to remove the outliers of every batch with ``remove_outliers``"""
+    if cnf['data']['scaling'].get('outlier_filter', 'batch') != 'streaming':
+        return None
+    if fitted_normalizers is not None and OUTLIER_FILTER_KEY in fitted_normalizers:
+        return fitted_normalizers[OUTLIER_FILTER_KEY]
+    return create_outlier_filter(cnf)
+
+
+def normalise_data(data: pd.DataFrame, cnf, fitted_normalizers: dict = None,
+                   outlier_filter: OutlierFilter = None):
+    if outlier_filter is not None:
+        data = outlier_filter.filter(data)
+    else:
+        data = remove_outliers(data, cnf['data'].get('remove_outliers', []))
     scaling = cnf['data']['scaling']
     normalizers = {}
-    for column in scaling['columns']:
-        if column in data:
-            scaled, normalizer = scale_array(data[column], scaling['normalizer'])
-            data[column] = scaled
-            normalizers[column] = normalizer
+    # patterns such as tx_quantiles_* select all the transaction summary columns
+    columns = [v for pattern in scaling['columns'] for v in fnmatch.filter(data.columns, pattern)]
+    for column in dict.fromkeys(columns):
+        if fitted_normalizers is not None and column in fitted_normalizers:
+            normalizer = fitted_normalizers[column]
+            # streaming normalizers keep learning from the new blocks unless frozen
+            if hasattr(normalizer, 'partial_fit'):
+                normalizer.partial_fit(data[column])
+            scaled = normalizer.transform(data[column])
+        else:
+            scaled, normalizer = scale_array(data[column], scaling['normalizer'],
+                                             scaling.get('normalizer_args'))
+        data[column] = scaled
+        normalizers[column] = normalizer
+    if outlier_filter is not None:
+        normalizers[OUTLIER_FILTER_KEY] = outlier_filter
     # print('after scaling\n', data.head())
     return data, normalizers
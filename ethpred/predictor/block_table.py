@@ -0,0 +1,145 @@
+from typing import List, Optional, Union
+import datetime as dt
+
+import numpy as np
+
+from ..pipeline.block_store import BlockColumns
+
+
+# timestamp of the blocks whose time is unknown, e.g. built from a mapping of prices
+NO_TIMESTAMP: int = np.iinfo(np.int64).min
+
+
+class BlockTable:
+    """Minimum gas price and timestamp of every block in contiguous arrays,
+    indexed by ``block_number - first_block``
+
+    A block missing from the data has ``present`` False, a block without any
+    transaction has a minimum price of 0. The table is read-only so that a
+    single instance can be shared by the predictors and the analyzer.
+
+    Args:
+        first_block: Number of the block at index 0
+        min_prices: Minimum gas price of every block, 0 if none
+        timestamps: Timestamp of every block, ``NO_TIMESTAMP`` if unknown
+        present: Whether every block is in the data
+    """
+    def __init__(self, first_block: int, min_prices: np.ndarray, timestamps: np.ndarray,
+                 present: np.ndarray):
+        self.first_block = first_block
+        self.min_prices = min_prices
+        self.timestamps = timestamps
+        self.present = present
+        for array in (min_prices, timestamps, present):
+            array.flags.writeable = False
+
+    def __len__(self):
+        return len(self.present)
+
+    def __repr__(self):
+        return "BlockTable(first_block={0}, last_block={1})".format(self.first_block,
+                                                                     self.last_block)
+
+    def __contains__(self, block_number: int) -> bool:
+        index = block_number - self.first_block
+        return 0 <= index < len(self.present) and bool(self.present[index])
+
+    @property
+    def last_block(self) -> int:
+        return self.first_block + len(self.present) - 1
+
+    @classmethod
+    def create(cls, gas_price: Union['BlockTable', BlockColumns, dict, List[dict]]) -> 'BlockTable':
+        """Builds the table from any of the representations of the blocks used in the
+        package, an existing table is returned as is so that it is shared
+        """
+        if isinstance(gas_price, BlockTable):
+            return gas_price
+        if isinstance(gas_price, BlockColumns):
+            return cls.from_columns(gas_price)
+        if isinstance(gas_price, dict):
+            return cls.from_prices(gas_price)
+        return cls.from_blocks(gas_price)
+
+    @classmethod
+    def from_arrays(cls, block_numbers, min_prices, timestamps) -> 'BlockTable':
+        """Scatters the values of the given blocks, in any order, into a dense table.
+        The last value of a duplicated block is kept
+        """
+        block_numbers = np.asarray(block_numbers, dtype=np.int64)
+        if len(block_numbers) == 0:
+            return cls(0, np.zeros(0, dtype=np.int64), np.zeros(0, dtype=np.int64),
+                       np.zeros(0, dtype=bool))
+        first_block = int(block_numbers.min())
+        size = int(block_numbers.max()) - first_block + 1
+        index = block_numbers - first_block
+        dense_prices = np.zeros(size, dtype=np.int64)
+        dense_prices[index] = np.nan_to_num(np.asarray(min_prices, dtype=np.float64), nan=0)
+        dense_timestamps = np.full(size, NO_TIMESTAMP, dtype=np.int64)
+        dense_timestamps[index] = timestamps
+        present = np.zeros(size, dtype=bool)
+        present[index] = True
+        return cls(first_block, dense_prices, dense_timestamps, present)
+
+    @classmethod
+    def from_blocks(cls, blocks: List[dict]) -> 'BlockTable':
+        """From raw blocks as found in the JSONL file"""
+        block_numbers = [v['block_number'] for v in blocks]
+        min_prices = [(v.get('min_price_tx') or {}).get('gas_price') or 0 for v in blocks]
+        timestamps = [v.get('timestamp', NO_TIMESTAMP) for v in blocks]
+        return cls.from_arrays(block_numbers, min_prices, timestamps)
+
+    @classmethod
+    def from_columns(cls, blocks: BlockColumns) -> 'BlockTable':
+        return cls.from_arrays(blocks['block_number'], blocks['min_price_tx'],
+                               blocks['timestamp'])
+
+    @classmethod
+    def from_prices(cls, min_prices: dict) -> 'BlockTable':
+        """From a mapping of block number to minimum price, the timestamps are unknown"""
+        return cls.from_arrays(list(min_prices.keys()), list(min_prices.values()),
+                               np.full(len(min_prices), NO_TIMESTAMP, dtype=np.int64))
+
+    def get_min_price(self, block_number: int, default: int = None) -> Optional[int]:
+        index = block_number - self.first_block
+        if index < 0 or index >= len(self.present):
+            return default
+        price = self.min_prices[index]
+        return int(price) if price else default
+
+    def get_timestamp(self, block_number: int) -> Optional[int]:
+        index = block_number - self.first_block
+        if index < 0 or index >= len(self.present):
+            return None
+        timestamp = self.timestamps[index]
+        return None if timestamp == NO_TIMESTAMP else int(timestamp)
+
+    def get_datetime(self, block_number: int) -> Optional[dt.datetime]:
+        timestamp = self.get_timestamp(block_number)
+        if timestamp is None:
+            return None
+        return dt.datetime.fromtimestamp(timestamp)
+
+    def _range(self, array: np.ndarray, start: int, end: int, fill) -> np.ndarray:
+        """Values of the blocks ``start`` to ``end`` included, ``fill`` outside of the table"""
+        size = max(end - start + 1, 0)
+        lo = min(max(start - self.first_block, 0), len(array))
+        hi = min(max(end - self.first_block + 1, 0), len(array))
+        if hi - lo == size:
+            # entirely inside of the table, no copy
+            return array[lo:hi]
+        values = np.full(size, fill, dtype=array.dtype)
+        if hi > lo:
+            offset = lo - (start - self.first_block)
+            values[offset:offset + hi - lo] = array[lo:hi]
+        return values
+
+    def min_prices_range(self, start: int, end: int) -> np.ndarray:
+        """Minimum prices of the blocks ``start`` to ``end`` included, 0 if missing"""
+        return self._range(self.min_prices, start, end, 0)
+
+    def timestamps_range(self, start: int, end: int) -> np.ndarray:
+        return self._range(self.timestamps, start, end, NO_TIMESTAMP)
+
+    def present_range(self, start: int, end: int) -> np.ndarray:
+        return self._range(self.present, start, end, False)
@@ -1,14 +1,34 @@
-from typing import List
+from typing import List, Union
+from collections import deque
 import math
 
+import numpy as np
+from numpy.lib.stride_tricks import sliding_window_view
 from sortedcontainers import SortedList
 
 from .predictor import Predictor
+from .block_table import BlockTable
 
 # any big value should do, it is just so that it is not returned by min
 NOT_FOUND_GAS = 1e20
 
 
+def sliding_min(values: np.ndarray, width: int) -> np.ndarray:
+    """Minimum of every window of ``width`` consecutive values in O(n)
+    (van Herk/Gil-Werman): the minimum of a window is the minimum of the suffix of
+    the chunk of ``width`` values it starts in and of the prefix of the next one
+    """
+    count = len(values) - width + 1
+    if count <= 0:
+        return np.zeros(0, dtype=values.dtype)
+    padded = np.full(-(-len(values) // width) * width, values.max(), dtype=values.dtype)
+    padded[:len(values)] = values
+    chunks = padded.reshape(-1, width)
+    prefix = np.minimum.accumulate(chunks, axis=1).reshape(-1)
+    suffix = np.minimum.accumulate(chunks[:, ::-1], axis=1)[:, ::-1].reshape(-1)
+    return np.minimum(suffix[:count], prefix[width - 1:width - 1 + count])
+
+
 class ClairvoyantPredictor(Predictor):
     """The ClairvoyantPredictor cheats and uses prices from the future
     to predict prices in the future. More precisely, it uses the lowest
@@ -17,6 +37,10 @@ class ClairvoyantPredictor(Predictor):
     This is used to evaluate what is the maximum savings that a contract
     could do by waiting for at most X blocks before submitting the transaction
 
+    The window of the next blocks slides with the predicted block: the minimum is
+    kept in a monotonic deque and, with ``max_stdevs``, the prices in a SortedList
+    with the exact integer sums of the prices and of their squares.
+
     Args:
         gas_price: A list of gas prices information about blocks
         blocks_to_wait: The maximum number of blocks to wait for the transactions
@@ -25,52 +49,84 @@ class ClairvoyantPredictor(Predictor):
                     is not allowed to be. This is used to avoid using a total
                     outlier gas price
     """
-    def __init__(self, gas_price: List[dict], blocks_to_wait: int = 240,
+    # predict_range raises on the windows without any price, which predict_price is
+    # never asked for by the analyzer, and its statistics are not the exact ones,
+    # so the analyzer keeps the per-block path
+    vectorized = False
+
+    def __init__(self, gas_price: Union[BlockTable, List[dict]], blocks_to_wait: int = 240,
                  max_stdevs: float = None):
         super().__init__(gas_price)
         self.blocks_to_wait = blocks_to_wait
         self.max_stdevs = max_stdevs
+        # the window holds the blocks in (_low, _high]
+        self._low = None
+        self._high = None
+        # (block_number, price) of increasing prices, the minimum of the window first
+        self._minimums = deque()
         self._available_prices = SortedList()
-        self._initialized = False
 
-        # to compute mean and stdev in O(1)
+        # to compute mean and stdev in O(1), exact as the prices are integers
         self._rolling_price_total = 0
         self._rolling_squared_total = 0
 
     @classmethod
-    def from_cnf(cls, min_prices: List[dict], kwargs: dict, _cnf: dict):
+    def from_cnf(cls, min_prices: BlockTable, kwargs: dict, _cnf: dict):
         return cls(min_prices, **kwargs)
 
     def current_price_mean(self):
         return self._rolling_price_total / len(self._available_prices)
 
     def current_price_stdev(self):
-        mean = self.current_price_mean()
-        second_moment = self._rolling_squared_total / len(self._available_prices)
-        variance = second_moment - mean ** 2
+        count = len(self._available_prices)
+        # n * sum(x^2) - sum(x)^2 is computed exactly, without cancellation
+        variance = (count * self._rolling_squared_total - self._rolling_price_total ** 2) \
+            / (count * count)
         return math.sqrt(variance)
 
     def _add_price(self, block_number):
         price = self.get_min_price(block_number)
-        if price:
+        if not price:
+            return
+        if self.max_stdevs is None:
+            while self._minimums and self._minimums[-1][1] >= price:
+                self._minimums.pop()
+            self._minimums.append((block_number, price))
+        else:
             self._rolling_price_total += price
             self._rolling_squared_total += price * price
             self._available_prices.add(price)
 
     def _remove_price(self, block_number):
+        if self.max_stdevs is None:
+            while self._minimums and self._minimums[0][0] <= block_number:
+                self._minimums.popleft()
+            return
         price = self.get_min_price(block_number)
         if price:
-            try:
-                self._available_prices.remove(price)
-                self._rolling_price_total -= price
-                self._rolling_squared_total -= price * price
-            except ValueError:
-                pass
-
-    def _initialize(self, start_block, end_block):
-        for block_number in range(start_block, end_block + 1):
-            self._add_price(block_number)
-        self._initialized = True
+            self._available_prices.remove(price)
+            self._rolling_price_total -= price
+            self._rolling_squared_total -= price * price
+
+    def _reset(self, block_number):
+        self._minimums.clear()
+        self._available_prices.clear()
+        self._rolling_price_total = 0
+        self._rolling_squared_total = 0
+        self._low = self._high = block_number
+
+    def _move_window(self, block_number):
+        end_block = block_number + self.blocks_to_wait
+        # start over when going back or when none of the blocks can be kept
+        if self._low is None or block_number < self._low or \
+                end_block - self._high > self.blocks_to_wait:
+            self._reset(block_number)
+        for removed_block in range(self._low + 1, block_number + 1):
+            self._remove_price(removed_block)
+        for added_block in range(self._high + 1, end_block + 1):
+            self._add_price(added_block)
+        self._low = block_number
+        self._high = end_block
 
     def predict_price(self, block_number: int) -> int:
         """Returns the minimal gas price in the next ``blocks_to_wait``
@@ -79,16 +135,49 @@ class ClairvoyantPredictor(Predictor):
             block_number: Block number for which the price should be predicted.
         Returns: gas price
         """
-        end_block = block_number + self.blocks_to_wait
-        if not self._initialized:
-            self._initialize(block_number + 1, end_block)
-        else:
-            self._remove_price(block_number)
-            self._add_price(end_block)
+        self._move_window(block_number)
         if self.max_stdevs is None:
-            return self._available_prices[0]
+            if not self._minimums:
+                raise ValueError("no possible price found")
+            return self._minimums[0][1]
+        if not self._available_prices:
+            raise ValueError("no possible price found")
         min_price = self.current_price_mean() - self.max_stdevs * self.current_price_stdev()
-        for price in self._available_prices:
-            if price >= min_price:
-                return price
-        raise ValueError("no possible price found")
+        index = self._available_prices.bisect_left(min_price)
+        if index == len(self._available_prices):
+            raise ValueError("no possible price found")
+        return self._available_prices[index]
+
+    def predict_range(self, start_block: int, end_block: int, chunk_size: int = 4096) -> np.ndarray:
+        """Offline ``predict_price`` of every block from ``start_block`` to ``end_block``
+        included, computed in one pass over the prices. With ``max_stdevs`` the windows
+        are processed by chunks of ``chunk_size`` blocks and their statistics computed in
+        float64 in two passes
+        """
+        width = self.blocks_to_wait
+        if self.max_stdevs is None:
+            prices = self.blocks.min_prices_range(start_block + 1, end_block + width)
+            prices = np.where(prices > 0, prices, np.iinfo(np.int64).max)
+            suggested_prices = sliding_min(prices, width)
+            not_found = suggested_prices == np.iinfo(np.int64).max
+        else:
+            suggested_prices = []
+            for chunk_start in range(start_block, end_block + 1, chunk_size):
+                chunk_end = min(chunk_start + chunk_size - 1, end_block)
+                prices = self.blocks.min_prices_range(chunk_start + 1, chunk_end + width)
+                windows = sliding_window_view(prices.astype(np.float64), width)
+                available = windows > 0
+                with np.errstate(invalid='ignore', divide='ignore'):
+                    counts = available.sum(axis=1)
+                    mean = np.where(available, windows, 0).sum(axis=1) / counts
+                    deviations = np.where(available, windows - mean[:, None], 0)
+                    stdev = np.sqrt((deviations ** 2).sum(axis=1) / counts)
+                    min_price = mean - self.max_stdevs * stdev
+                allowed = available & (windows >= min_price[:, None])
+                suggested_prices.append(np.where(allowed, windows, NOT_FOUND_GAS).min(axis=1))
+            suggested_prices = np.concatenate(suggested_prices) if suggested_prices else np.zeros(0)
+            not_found = suggested_prices == NOT_FOUND_GAS
+        if np.any(not_found):
+            raise ValueError("no possible price found for block {0}".format(
+                start_block + int(np.argmax(not_found))))
+        return suggested_prices.astype(np.float64)
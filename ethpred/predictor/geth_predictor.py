@@ -1,13 +1,101 @@
-from typing import List
+from typing import List, Union
+import math
 
 import numpy as np
+from numpy.lib.stride_tricks import sliding_window_view
+from sortedcontainers import SortedList
 
 from .predictor import Predictor
+from .block_table import BlockTable
 
 
 MAX_PRICE: int = 500_000_000_000
 
 
+def sorted_percentile(values, percentile: float) -> float:
+    """Same as ``np.percentile(values, percentile)`` with the default linear method,
+    for values already sorted which support indexing, e.g. a SortedList
+    """
+    n = len(values)
+    quantile = percentile / 100
+    # same operations as numpy so that the results are identical
+    virtual_index = (n - 1) * quantile
+    if virtual_index >= n - 1:
+        return float(values[n - 1])
+    if virtual_index < 0:
+        return float(values[0])
+    previous_index = math.floor(virtual_index)
+    gamma = virtual_index - previous_index
+    a = float(values[previous_index])
+    b = float(values[previous_index + 1])
+    diff_b_a = b - a
+    if gamma >= 0.5:
+        return b - diff_b_a * (1 - gamma)
+    return a + diff_b_a * gamma
+
+
+def sorted_percentile_rows(values: np.ndarray, counts: np.ndarray, percentile: float) -> np.ndarray:
+    """Vectorised ``sorted_percentile`` of the first ``counts`` values of every sorted row,
+    0 for the empty rows
+    """
+    rows = np.arange(len(values))
+    quantile = percentile / 100
+    virtual_index = (counts - 1) * quantile
+    previous_index = np.floor(virtual_index)
+    gamma = virtual_index - previous_index
+    previous_index = previous_index.astype(np.int64)
+    last = np.maximum(counts - 1, 0)
+    previous_index = np.clip(previous_index, 0, last)
+    next_index = np.minimum(previous_index + 1, last)
+    a = values[rows, previous_index].astype(np.float64)
+    b = values[rows, next_index].astype(np.float64)
+    diff_b_a = b - a
+    result = np.where(gamma >= 0.5, b - diff_b_a * (1 - gamma), a + diff_b_a * gamma)
+    return np.where(counts > 0, result, 0)
+
+
+class LookBackWindow:
+    """Sorted prices of the blocks considered by geth, updated block by block
+
+    The window holds the non-empty blocks of ``[low, end)`` and the number of empty
+    ones, the first ``max_empty`` empty blocks before ``end`` being skipped.
+    It behaves as a sorted sequence of the prices, the empty blocks counting as 0.
+    """
+    def __init__(self, max_empty: int):
+        self.max_empty = max_empty
+        self.prices = SortedList()
+        self.empty = 0
+        self.low = 0
+        self.end = 0
+
+    def __len__(self):
+        return len(self.prices) + self.included_empty
+
+    def __getitem__(self, index: int):
+        included_empty = self.included_empty
+        return 0 if index < included_empty else self.prices[index - included_empty]
+
+    @property
+    def included_empty(self) -> int:
+        return max(self.empty - self.max_empty, 0)
+
+    def add(self, price: int):
+        """Adds the block ``end``"""
+        if price:
+            self.prices.add(price)
+        else:
+            self.empty += 1
+        self.end += 1
+
+    def remove(self, price: int):
+        """Removes the block ``low``"""
+        if price:
+            self.prices.remove(price)
+        else:
+            self.empty -= 1
+        self.low += 1
+
+
 class GethPredictor(Predictor):
     """Geth 'algorithm' to suggest a price is very straight forward
     It simply uses a tunable percentile for the minimum price in the past blocks
@@ -16,6 +104,9 @@ class GethPredictor(Predictor):
     Original logic can be found here:
     https://github.com/ethereum/go-ethereum/blob/master/eth/gasprice/gasprice.go
 
+    The look-behind window slides with the predicted block, so predicting consecutive
+    blocks only adds and evicts a few prices instead of walking back the whole window.
+
     Args:
         gas_price: A list of gas prices information about blocks
         blocks_count: This number will be multiplied by 5 to obtain
@@ -23,8 +114,10 @@ class GethPredictor(Predictor):
                       to find the number of empty blocks to skip
             percentile: This is the percentile to use when suggesting the price
     """
+    vectorized = True
+
     def __init__(self,
-                 gas_price: List[dict],
+                 gas_price: Union[BlockTable, List[dict]],
                  blocks_count: int = 20,
                  percentile: float = 60,
                  factor: float = 1.0):
@@ -32,12 +125,54 @@ class GethPredictor(Predictor):
         self.blocks_count = blocks_count
         self.percentile = min(max(0, percentile), 100)
         self.max_blocks = self.blocks_count * 5
+        # empty blocks skipped before the empty blocks are counted as 0
+        self.max_empty = self.blocks_count // 2 + 1
         self.factor = factor
+        self._window = None
 
     @classmethod
-    def from_cnf(cls, min_prices: List[dict], kwargs: dict, _cnf: dict):
+    def from_cnf(cls, min_prices: BlockTable, kwargs: dict, _cnf: dict):
         return cls(min_prices, **kwargs)
 
+    def _fill_window(self, block_number: int) -> LookBackWindow:
+        """Walks back from ``block_number`` as geth does to build its window"""
+        window = LookBackWindow(self.max_empty)
+        current_block_number = block_number - 1
+        while current_block_number >= 0 and len(window) < self.max_blocks:
+            price = self.get_min_price(current_block_number, 0)
+            if price:
+                window.prices.add(price)
+            else:
+                window.empty += 1
+            current_block_number -= 1
+        window.low = current_block_number + 1
+        window.end = block_number
+        return window
+
+    def _slide_window(self, block_number: int):
+        window = self._window
+        while window.end < block_number:
+            window.add(self.get_min_price(window.end, 0))
+            # evict the oldest blocks as long as the window stays full
+            while window.low < window.end:
+                price = self.get_min_price(window.low, 0)
+                if price:
+                    remaining = len(window) - 1
+                else:
+                    remaining = len(window) - (window.empty > window.max_empty)
+                if remaining < self.max_blocks:
+                    break
+                window.remove(price)
+
+    def _look_back_window(self, block_number: int) -> LookBackWindow:
+        window = self._window
+        # only slide forward, and when it is cheaper than walking back
+        if window is None or not 0 <= block_number - window.end <= self.max_blocks:
+            self._window = self._fill_window(block_number)
+        else:
+            self._slide_window(block_number)
+        return self._window
+
     def predict_price(self, block_number: int) -> int:
         """Mimics the logic of geth to suggest a gas price
 
@@ -46,17 +181,35 @@ class GethPredictor(Predictor):
                           Block must be in the min_prices give during initialization
         Returns: gas price
         """
-        max_empty = self.blocks_count // 2
-        prices = []
-        current_block_number = block_number - 1
-        while block_number >= 0 and len(prices) < self.max_blocks:
-            price = self.get_min_price(current_block_number, 0)
-            if price == 0 and max_empty >= 0:
-                max_empty -= 1
-                continue
-            prices.append(price)
-            current_block_number -= 1
-        suggested_price = int(np.percentile(prices, q=self.percentile))
+        window = self._look_back_window(block_number)
+        if not len(window):
+            return 0
+        suggested_price = int(sorted_percentile(window, self.percentile))
         if suggested_price >= MAX_PRICE:
             suggested_price = MAX_PRICE
         return suggested_price * self.factor
+
+    def predict_range(self, start_block: int, end_block: int, chunk_size: int = 4096) -> np.ndarray:
+        """Vectorised ``predict_price`` of the blocks ``start_block`` to ``end_block``
+        included. The look-back windows are strided views over the prices, processed
+        by chunks of ``chunk_size`` blocks to bound the memory used
+        """
+        # the walk back visits at most max_blocks prices and max_empty skipped blocks
+        width = self.max_blocks + self.max_empty
+        suggested_prices = []
+        for chunk_start in range(start_block, end_block + 1, chunk_size):
+            chunk_end = min(chunk_start + chunk_size - 1, end_block)
+            prices = self.blocks.min_prices_range(chunk_start - width, chunk_end - 1)
+            # the blocks looked behind every block, most recent first
+            windows = sliding_window_view(prices, width)[:, ::-1]
+            block_numbers = np.arange(chunk_start, chunk_end + 1)[:, None] - 1 - np.arange(width)
+            empty = windows == 0
+            skipped = empty & (np.cumsum(empty, axis=1) <= self.max_empty)
+            included = ~skipped & (block_numbers >= 0)
+            included &= np.cumsum(included, axis=1) <= self.max_blocks
+            values = np.sort(np.where(included, windows, np.iinfo(np.int64).max), axis=1)
+            percentiles = sorted_percentile_rows(values, included.sum(axis=1), self.percentile)
+            suggested_prices.append(np.minimum(np.trunc(percentiles), MAX_PRICE) * self.factor)
+        if not suggested_prices:
+            return np.zeros(0)
+        return np.concatenate(suggested_prices)
@@ -1,40 +1,74 @@
-from typing import List
+from typing import List, Union
 import datetime as dt
-import bisect
+from os import path
 
 import numpy as np
+import pandas as pd
 import torch
-from sklearn.linear_model import LinearRegression
-from sklearn.preprocessing import MinMaxScaler
 
 from .predictor import Predictor
+from .block_table import BlockTable, NO_TIMESTAMP
+from ..pipeline.block_store import local_datetime_index
 from ..pipeline.inference import predict_prices
+from ..pipeline.normalizers import NORMALIZERS_FILE, load_normalizers
+
+
+def trend_slopes(predictions: np.ndarray) -> np.ndarray:
+    """Slope of the least squares line through every row of predictions, in closed
+    form: the product of the rows with the centred steps over their squared norm
+    """
+    steps = np.arange(predictions.shape[1], dtype=np.float64)
+    centred_steps = steps - steps.mean()
+    return predictions @ centred_steps / (centred_steps @ centred_steps)
+
+
+def min_max_scale(values: np.ndarray, low: float, high: float) -> np.ndarray:
+    """Scales the values linearly to [low, high] as sklearn's MinMaxScaler,
+    a constant array is mapped to ``low``
+    """
+    if len(values) == 0:
+        return values
+    data_range = values.max() - values.min()
+    scale = (high - low) / (data_range if data_range != 0 else 1.0)
+    return values * scale + (low - values.min() * scale)
 
 
 class ModelPredictor(Predictor):
     """ModelPredictor uses a pre-trained model information to predict the
     ideal gas cost
+
+    The suggested price of every row of predictions, its percentile scaled by the
+    trend of the row, is computed once so that a prediction is a lookup
     """
-    def __init__(self, gas_price: List[dict],
-                 timestamps: List[dt.datetime],
-                 predictions: List[np.ndarray],
+    vectorized = True
+
+    def __init__(self, gas_price: Union[BlockTable, List[dict]],
+                 timestamps: np.ndarray,
+                 predictions: np.ndarray,
                  percentile: int = 20,
                  utility: float = 0.9):
         super().__init__(gas_price)
-        self.timestamps = timestamps
-        self.predictions = predictions
+        # int64 nanoseconds of the naive local times, as returned by predict_prices
+        self.timestamps = np.asarray(timestamps, dtype=np.int64)
+        self.predictions = np.asarray(predictions)
         self.percentile = percentile
         self.utility = utility
         self.trends = self._compute_trends()
+        # the suggested price of every row of predictions
+        self.suggestions = self._compute_suggestions()
 
-    def _find_predictions(self, timestamp):
-        index = bisect.bisect_right(self.timestamps, timestamp) - 1
-        return self.predictions[index], self.trends[index]
+    def _find_index(self, datetime: dt.datetime) -> int:
+        return np.searchsorted(self.timestamps, pd.Timestamp(datetime).value, side='right') - 1
 
     @classmethod
-    def from_cnf(cls, min_prices: List[dict], kwargs: dict, cnf: dict):
+    def from_cnf(cls, min_prices: BlockTable, kwargs: dict, cnf: dict):
         model = torch.load(kwargs['model_path'])
-        timestamps, predictions = predict_prices(cnf, model)
+        # the normalizers are saved next to the model by the training logger
+        normalizers_path = kwargs.get('normalizers_path', path.join(
+            path.dirname(kwargs['model_path']), NORMALIZERS_FILE))
+        normalizers = load_normalizers(normalizers_path, frozen=True) \
+            if path.exists(normalizers_path) else None
+        timestamps, predictions = predict_prices(cnf, model, normalizers)
         return cls(min_prices, timestamps, predictions,
                    kwargs.get('percentile', 20), kwargs.get('utility', 0.9))
 
@@ -45,24 +79,38 @@ class ModelPredictor(Predictor):
             datetime = self.get_datetime(block_number)
         return datetime
 
+    def get_block_times(self, start_block: int, end_block: int) -> np.ndarray:
+        """Vectorised ``get_block_datetime`` of a range of blocks, as int64 nanoseconds
+        of the naive local times like the timestamps of the predictions
+        """
+        timestamps = self.blocks.timestamps_range(start_block, end_block).copy()
+        block_number = start_block
+        while len(timestamps) and timestamps[0] == NO_TIMESTAMP:
+            block_number -= 1
+            timestamps[0] = self.blocks.timestamps_range(block_number, block_number)[0]
+        # the missing blocks take the time of the last block before them
+        known = timestamps != NO_TIMESTAMP
+        last_known = np.maximum.accumulate(np.where(known, np.arange(len(timestamps)), 0))
+        return local_datetime_index(timestamps[last_known]).asi8
+
     def _compute_trends(self):
-        trends = []
-        for pred in self.predictions:
-            trend = self.get_trend(pred)
-            trends.append(trend)
-        scaler = MinMaxScaler((-2, 0))
-        trends = scaler.fit_transform(np.array(trends).reshape(-1, 1)).reshape(-1)
-        return trends
+        return min_max_scale(trend_slopes(self.predictions.reshape(len(self.predictions), -1)),
+                             -2, 0)
+
+    def _compute_suggestions(self):
+        values = np.percentile(self.predictions.reshape(len(self.predictions), -1),
+                               q=self.percentile, axis=1)
+        coefficients = np.exp(self.trends) * self.utility
+        return values * coefficients
 
     def get_trend(self, predictions):
-        model = LinearRegression()
-        X = np.arange(len(predictions)).reshape(-1, 1)
-        model.fit(X, predictions)
-        return model.coef_[0]
+        return trend_slopes(np.asarray(predictions, dtype=np.float64).reshape(1, -1))[0]
 
     def predict_price(self, block_number: int) -> int:
         datetime = self.get_block_datetime(block_number)
-        predictions, trend = self._find_predictions(datetime)
-        value = np.percentile(predictions, q=self.percentile)
-        coefficient = np.exp(trend) * self.utility
-        return value * coefficient
+        return self.suggestions[self._find_index(datetime)]
+
+    def predict_range(self, start_block: int, end_block: int) -> np.ndarray:
+        index = np.searchsorted(self.timestamps, self.get_block_times(start_block, end_block),
+                                side='right') - 1
+        return self.suggestions[index]
@@ -1,22 +1,31 @@
 import datetime as dt
 
+import numpy as np
+
+from .block_table import BlockTable
+
 
 class Predictor:
+    """Base of the predictors, the blocks can be given as raw blocks, BlockColumns,
+    a mapping of block number to minimum price or a BlockTable shared with others
+    """
+    # whether predict_range is vectorised and its predictions independent of the
+    # order in which the blocks are predicted, so that it can replace predict_price
+    vectorized = False
+
     def __init__(self, gas_price):
-        self.raw_prices = gas_price
-        self.indexed_prices = {v["block_number"]: v for v in gas_price}
+        self.blocks = BlockTable.create(gas_price)
 
     def get_min_price(self, block_number: int, default: int = None) -> int:
-        block = self.indexed_prices.get(block_number)
-        if not block:
-            return default
-        return block["min_price_tx"]["gas_price"]
+        return self.blocks.get_min_price(block_number, default)
 
     def get_datetime(self, block_number: int) -> dt.datetime:
-        block = self.indexed_prices.get(block_number)
-        if not block:
-            return None
-        return dt.datetime.fromtimestamp(block["timestamp"])
+        return self.blocks.get_datetime(block_number)
 
     def predict_price(self, block_number: int) -> int:
         raise NotImplementedError()
+
+    def predict_range(self, start_block: int, end_block: int) -> np.ndarray:
+        """Predicts the prices of the blocks ``start_block`` to ``end_block`` included"""
+        return np.array([self.predict_price(v) for v in range(start_block, end_block + 1)],
+                        dtype=np.float64)
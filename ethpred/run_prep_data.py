@@ -1,28 +1,71 @@
+from os import path
+
 import numpy as np
 import pandas as pd
 import torch
-from .pipeline.generate_data import generate_data, create_dataloaders
+from .pipeline.generate_data import generate_data, create_dataloaders, create_lazy_dataloaders
 from .models.configure_model import configure_model
 from .training.training_loops import GRU_training
 from .training.logger import Logger
 from .pipeline.generate_data import sliding_window
-from .pipeline.to_pandas import convert_to_dataframe
-from .pipeline.data_reader import read_data
+from .pipeline.data_reader import read_dataframe
+from .pipeline.normalizers import dump_normalizers, load_normalizers
+from .pipeline.tensor_dataset import has_tensor_dataset, open_tensor_dataset, \
+    write_tensor_dataset
 
 def prep_data(cnf: dict):
-    eth_price, gas_price = read_data(cnf)
-    data, _normalizers = convert_to_dataframe(eth_price, gas_price, cnf)
+    data, normalizers = read_dataframe(cnf)
     data.to_pickle(cnf['data']['data_path'])
+    dump_normalizers(normalizers, get_normalizers_path(cnf['data']['data_path']))
     print("Data saved to: ", cnf['data']['data_path'])
 
+    tensor_path = cnf['data'].get('tensor_path')
+    if tensor_path is not None:
+        X, y = create_windows(data, cnf)
+        write_tensor_dataset(tensor_path, data, X, y, normalizers, cnf)
+        print("Tensors saved to: ", tensor_path)
+
+
+def get_normalizers_path(data_path: str) -> str:
+    return path.splitext(data_path)[0] + '.normalizers.json'
+
 
 def run_prepped(cnf: dict):
     np.random.seed(42)
     torch.manual_seed(42)
 
-    # Load stored data
-    data = pd.read_pickle(cnf['data']['data_path'])
+    if has_tensor_dataset(cnf):
+        # the windows are already built, they are memory-mapped
+        dataset = open_tensor_dataset(cnf['data']['tensor_path'], cnf)
+        data = dataset.frame()
+        normalizers = dataset.normalizers
+        cnf['data']['y_cols'] = dataset.manifest['y_cols']
+        cnf['model']['input_size'] = dataset.X.shape[2]
+        X_train, y_train, X_test, y_test = dataset.split()
+        train, test = create_dataloaders(X_train, y_train, X_test, y_test, cnf)
+    else:
+        # Load stored data
+        data = pd.read_pickle(cnf['data']['data_path'])
+        normalizers_path = get_normalizers_path(cnf['data']['data_path'])
+        normalizers = load_normalizers(normalizers_path) if path.exists(normalizers_path) else None
+
+        if cnf['data'].get('lazy_windows'):
+            train, test = create_lazy_dataloaders(data, cnf)
+        else:
+            train, test = create_eager_dataloaders(data, cnf)
+
+    model = configure_model(cnf)
 
+    logger = Logger(cnf, data=data, normalizers=normalizers, dataloaders=(train, test))
+
+    GRU_training(model=model,
+                 train_dataloader=train,
+                 test_dataloader=test,
+                 cnf=cnf['training'],
+                 logger=logger)
+
+
+def create_windows(data: pd.DataFrame, cnf: dict):
     if cnf['type'] == 'distribution':
         cnf['data']['y_cols'] = ['mean', 'std_dev']
     y_col_idxs = []
@@ -30,8 +73,7 @@ def run_prepped(cnf: dict):
         idx = data.columns.get_loc(col)
         y_col_idxs.append(idx)
 
-    data_df = data.copy()
-    data = data.to_numpy()
+    data = data.to_numpy(dtype=np.float32)
 
     X, y = sliding_window(data, cnf['data'])
 
@@ -40,6 +82,11 @@ def run_prepped(cnf: dict):
 
     print("X shape:", X.shape)
     print("y shape:", y.shape)
+    return X, y
+
+
+def create_eager_dataloaders(data: pd.DataFrame, cnf: dict):
+    X, y = create_windows(data, cnf)
 
     # Adjust the input size of the model is necessary (needed if all transactions are included)
     cnf['model']['input_size'] = X.shape[2]
@@ -53,13 +100,4 @@ def run_prepped(cnf: dict):
     # print(X_train[0])
     # print(y_train[0])
 
-    train, test = create_dataloaders(X_train, y_train, X_test, y_test, cnf)
-    model = configure_model(cnf)
-
-    logger = Logger(cnf, data=data_df)
-
-    GRU_training(model=model,
-                 train_dataloader=train,
-                 test_dataloader=test,
-                 cnf=cnf['training'],
-                 logger=logger)
+    return create_dataloaders(X_train, y_train, X_test, y_test, cnf)
@@ -0,0 +1,163 @@
+import os
+from os import path
+import copy
+import math
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+import pandas as pd
+import torch
+
+from .pipeline.generate_data import create_lazy_dataloaders
+from .models.configure_model import configure_model
+from .training.training_loops import GRU_training
+
+
+def sample_value(rng, spec):
+    """Draws a value of a search space entry: a list of choices, or a range
+    ``{low, high}`` optionally sampled in log scale with ``log`` or as integers with ``int``
+    """
+    if isinstance(spec, list):
+        return spec[rng.integers(len(spec))]
+    low, high = spec['low'], spec['high']
+    if spec.get('log'):
+        value = math.exp(rng.uniform(math.log(low), math.log(high)))
+    else:
+        value = rng.uniform(low, high)
+    return int(round(value)) if spec.get('int') else float(value)
+
+
+def sample_params(rng, space: dict) -> dict:
+    return {k: sample_value(rng, v) for k, v in space.items()}
+
+
+def trial_config(cnf: dict, params: dict) -> dict:
+    """Copy of the configuration with the ``section.key`` parameters of a trial"""
+    trial_cnf = copy.deepcopy(cnf)
+    trial_cnf.pop('sweep', None)
+    for name, value in params.items():
+        section, key = name.split('.', 1)
+        trial_cnf[section][key] = value
+    return trial_cnf
+
+
+def share_series(cnf: dict, sweep_path: str) -> tuple:
+    """Writes the prepared data once as a .npy file memory-mapped by every trial,
+    the windows are sliced from it as they depend on the parameters of the trials
+    """
+    data = pd.read_pickle(cnf['data']['data_path'])
+    series_path = path.join(sweep_path, 'series.npy')
+    np.save(series_path, data.to_numpy(dtype=np.float32))
+    return series_path, list(data.columns)
+
+
+def run_trial(cnf: dict, series_path: str, columns: list) -> dict:
+    np.random.seed(42)
+    torch.manual_seed(42)
+    start = time.perf_counter()
+
+    # copy-on-write mapping, the pages of the series are shared by all the workers
+    data = pd.DataFrame(np.load(series_path, mmap_mode='c'), columns=columns, copy=False)
+    train, test = create_lazy_dataloaders(data, cnf)
+    model = configure_model(cnf)
+    loss = GRU_training(model=model,
+                        train_dataloader=train,
+                        test_dataloader=test,
+                        cnf=cnf['training'])
+    return dict(testing_loss=loss, seconds=time.perf_counter() - start)
+
+
+class Sweep:
+    """Hyperparameter search over ``run_prepped``, configured in the ``sweep`` section
+
+    The trials run in a pool of ``workers`` processes, each using ``threads_per_worker``
+    torch threads. With the ``halving`` method (successive halving) every trial is
+    trained for ``min_epochs`` epochs, then only the best ``1 / reduction_factor`` are
+    resumed from their checkpoint for ``reduction_factor`` times more epochs, and so on
+    up to ``training.num_epochs``.
+    """
+    def __init__(self, cnf: dict):
+        self.cnf = cnf
+        self.sweep_cnf = cnf['sweep']
+        self.sweep_path = self.sweep_cnf['path']
+        self.rng = np.random.default_rng(self.sweep_cnf.get('seed', 0))
+        self.results = []
+
+    def trial_configs(self) -> list:
+        configs = []
+        for i in range(self.sweep_cnf['trials']):
+            params = sample_params(self.rng, self.sweep_cnf['space'])
+            trial_cnf = trial_config(self.cnf, params)
+            # the data is already prepared, only the windows are built in the trials
+            trial_cnf['data']['lazy_windows'] = True
+            trial_cnf['training']['num_threads'] = self.sweep_cnf.get('threads_per_worker', 1)
+            trial_cnf['training']['checkpoint_path'] = path.join(
+                self.sweep_path, 'trial_{0}.pt'.format(i))
+            trial_cnf['training']['resume'] = True
+            # checkpoints of a previous sweep must not be resumed
+            if path.exists(trial_cnf['training']['checkpoint_path']):
+                os.remove(trial_cnf['training']['checkpoint_path'])
+            trial_cnf['training']['save_model'] = False
+            configs.append((i, params, trial_cnf))
+        return configs
+
+    def run_rung(self, executor, trials: list, epochs: int, series_path: str, columns: list):
+        futures = []
+        for i, params, trial_cnf in trials:
+            trial_cnf['training']['num_epochs'] = epochs
+            futures.append(executor.submit(run_trial, trial_cnf, series_path, columns))
+        losses = {}
+        for (i, params, _trial_cnf), future in zip(trials, futures):
+            try:
+                result = future.result()
+                status = 'done'
+            except Exception as e:
+                result = dict(testing_loss=np.nan, seconds=np.nan)
+                status = 'failed: {0}'.format(e)
+            self.results.append(dict(trial=i, epochs=epochs, status=status, **params, **result))
+            losses[i] = result['testing_loss']
+            self.save_results()
+        return losses
+
+    def save_results(self):
+        results = pd.DataFrame(self.results)
+        results.to_csv(path.join(self.sweep_path, 'results.csv'), index=False)
+        return results
+
+    def run(self) -> pd.DataFrame:
+        os.makedirs(self.sweep_path, exist_ok=True)
+        series_path, columns = share_series(self.cnf, self.sweep_path)
+        trials = self.trial_configs()
+        max_epochs = self.cnf['training']['num_epochs']
+
+        if self.sweep_cnf.get('method', 'random') == 'halving':
+            factor = self.sweep_cnf.get('reduction_factor', 3)
+            epochs = min(self.sweep_cnf.get('min_epochs', 1), max_epochs)
+        else:
+            factor = None
+            epochs = max_epochs
+
+        with ProcessPoolExecutor(max_workers=self.sweep_cnf.get('workers', 1)) as executor:
+            while trials:
+                print("Training {0} trials for {1} epochs".format(len(trials), epochs))
+                losses = self.run_rung(executor, trials, epochs, series_path, columns)
+                if factor is None or epochs >= max_epochs:
+                    break
+                # the failed trials have a NaN loss and are ranked last
+                ranked = sorted(trials, key=lambda v: np.nan_to_num(losses[v[0]], nan=np.inf))
+                trials = ranked[:max(1, len(trials) // factor)]
+                epochs = min(epochs * factor, max_epochs)
+
+        results = self.save_results()
+        if results.empty:
+            print("No trial to run")
+            return results
+        completed = results[results['epochs'] == results['epochs'].max()]
+        best = completed.sort_values('testing_loss').iloc[0]
+        print("Best trial:\n", best)
+        return results
+
+
+def run_sweep(cnf: dict):
+    return Sweep(cnf).run()
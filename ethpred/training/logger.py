@@ -3,22 +3,36 @@ from os import path
 import copy
 import time
 import json
+import logging
+import threading
 import numpy as np
 from datetime import datetime
 from matplotlib import pyplot as plt
+from matplotlib.figure import Figure
 import torch
 import yaml
 
 from ..pipeline.generate_data import generate_data
-from ..pipeline.generate_data import sliding_window
+from ..pipeline.generate_data import sliding_window, ordered_dataloader, to_tensor
+from ..pipeline.normalizers import NORMALIZERS_FILE, dump_normalizers
+
 
 class Logger:
-    def __init__(self, cnf, data=None):
+    """Saves the results of a training in ``training.log_path``
+
+    With ``training.log_mode: fast`` the predictions are computed by batches over the
+    data loaders used for the training and saved as .npy files, and the plots are
+    rendered according to ``training.plots``: ``sync``, ``async`` in a background
+    thread, or ``none`` to render them later on demand with ``render_plots``
+    """
+    def __init__(self, cnf, data=None, normalizers=None, dataloaders=None):
         self.cnf = cnf
         self.timestamp = datetime.now().strftime("%Y-%m-%dT%H_%M_%S.%f")
         self.save_path = path.join(cnf['training']['log_path'],
                                    'model_' + str(self.timestamp) + '/')
         self.data = data
+        self.normalizers = normalizers
+        self.dataloaders = dataloaders
 
     def plot_loss_hist(self, hist_train, hist_test):
         plt.figure(figsize=(14, 8))
@@ -31,8 +45,15 @@ class Logger:
 
     def dump_results(self, model, hist_train, hist_test, res_dict):
         os.mkdir(self.save_path)
-        self.plot_loss_hist(hist_train, hist_test)
-        self.generate_prediction_example(model)
+        fast = self.cnf['training'].get('log_mode', 'full') == 'fast'
+        if fast and self.dataloaders is None:
+            logging.warning("training.log_mode is fast but the logger has no data loaders, "
+                            "the predictions are made over the whole dataset")
+        if fast and self.dataloaders is not None:
+            self.save_predictions(model, hist_train, hist_test)
+        else:
+            self.plot_loss_hist(hist_train, hist_test)
+            self.generate_prediction_example(model)
 
         with open(self.save_path + 'config_and_results.txt', 'w') as f:
             print("########CONFIG########", file=f)
@@ -42,6 +63,9 @@ class Logger:
 
         if self.cnf['training']['save_model']:
             torch.save(model, self.save_path + 'model.pickle')
+            # needed to scale the features and unscale the predictions of the model
+            if self.normalizers is not None:
+                dump_normalizers(self.normalizers, self.save_path + NORMALIZERS_FILE)
 
     def generate_prediction_example(self, model):
         gen_cnf = copy.deepcopy(self.cnf)
@@ -79,14 +103,13 @@ class Logger:
         else:
             X_train, X_test, y_train, y_test = generate_data(gen_cnf)
 
-        X_test = torch.from_numpy(X_test).float()
-        y_test = torch.from_numpy(y_test).float()
-        X_train = torch.from_numpy(X_train).float()
-        y_train = torch.from_numpy(y_train).float()
+        X_test = to_tensor(X_test)
+        y_test = to_tensor(y_test)
+        X_train = to_tensor(X_train)
+        y_train = to_tensor(y_train)
 
-        with torch.no_grad():
-            y_pred = model(X_test)
-            y_pred_train = model(X_train)
+        y_pred = predict_batched(model, X_test)
+        y_pred_train = predict_batched(model, X_train)
 
         plt.figure(figsize=(14, 8))
         if gen_cnf['type'] == 'distribution':
@@ -125,3 +148,70 @@ class Logger:
         plt.savefig(self.save_path + 'test_prediction_example.png')
         if self.cnf['training']['show_plots']:
             plt.show()
+
+    def save_predictions(self, model, hist_train, hist_test):
+        """Fast logging: batched predictions over the training data loaders saved as .npy"""
+        np.save(self.save_path + 'loss_hist.npy', np.array([hist_train, hist_test]))
+        for name, dataloader in zip(('train', 'test'), self.dataloaders):
+            # the training batches may be shuffled, the predictions are saved in time order
+            y_pred, y_true = predict_dataloader(model, ordered_dataloader(dataloader))
+            np.save(self.save_path + 'preds_{0}.npy'.format(name), y_pred)
+            np.save(self.save_path + 'true_{0}.npy'.format(name), y_true)
+
+        plots = self.cnf['training'].get('plots', 'sync')
+        if plots == 'sync':
+            render_plots(self.save_path, self.cnf['type'])
+        elif plots == 'async':
+            # not a daemon so that the plots are finished before the process exits
+            threading.Thread(target=render_plots, args=(self.save_path, self.cnf['type'])).start()
+
+
+def predict_batched(model, X: torch.Tensor, batch_size: int = 1024) -> torch.Tensor:
+    with torch.inference_mode():
+        return torch.cat([model(X[i:i + batch_size]) for i in range(0, X.shape[0], batch_size)])
+
+
+def predict_dataloader(model, dataloader) -> tuple:
+    """Returns the predictions and targets of all the batches as float32 arrays"""
+    model.eval()
+    y_pred = []
+    y_true = []
+    with torch.inference_mode():
+        for x, y in dataloader:
+            y_pred.append(model(x).float().numpy())
+            y_true.append(y.numpy())
+    return np.concatenate(y_pred), np.concatenate(y_true)
+
+
+def render_plots(save_path: str, model_type: str = 'simple'):
+    """Renders the plots of a run logged in fast mode from its .npy files.
+    The figures are not managed by pyplot so this can run in a background thread
+    """
+    hist_train, hist_test = np.load(path.join(save_path, 'loss_hist.npy'))
+    fig = Figure(figsize=(14, 8))
+    ax = fig.add_subplot()
+    ax.plot(hist_train, color='b', label='train')
+    ax.plot(hist_test, color='r', label='test')
+    ax.legend()
+    fig.savefig(path.join(save_path, 'training_hist.png'))
+
+    y_pred = np.load(path.join(save_path, 'preds_test.npy'))
+    y_test = np.load(path.join(save_path, 'true_test.npy'))
+    fig = Figure(figsize=(14, 8))
+    ax = fig.add_subplot()
+    if model_type == 'distribution':
+        y_pred = y_pred.reshape([-1, 2])
+        y_test = y_test.reshape([-1, 2])
+        x = np.arange(y_test.shape[0])
+        ax.plot(x, y_test[:, 0], color='b', label='True')
+        ax.fill_between(x, y_test[:, 0] - 1.96 * y_test[:, 1], y_test[:, 0] + 1.96 * y_test[:, 1],
+                        color='royalblue', alpha=0.5)
+        ax.plot(x, y_pred[:, 0], color='r', label='Predicted')
+        ax.fill_between(x, y_pred[:, 0] - 1.96 * y_pred[:, 1], y_pred[:, 0] + 1.96 * y_pred[:, 1],
+                        color='tomato', alpha=0.5)
+    else:
+        # the first step predicted by every window
+        ax.plot(y_test.reshape(y_test.shape[0], -1)[:, 0], color='b', label='True')
+        ax.plot(y_pred.reshape(y_pred.shape[0], -1)[:, 0], color='r', label='Predicted')
+    ax.legend()
+    fig.savefig(path.join(save_path, 'test_prediction_example.png'))
@@ -1,8 +1,88 @@
+import os
+import copy
+import time
+
 import torch
 import torch.utils.data as du
 from tqdm import tqdm
 
 
+def configure_runtime(cnf):
+    """Applies the runtime options of the training configuration and returns the device"""
+    if cnf.get('num_threads'):
+        torch.set_num_threads(cnf['num_threads'])
+    return torch.device(cnf.get('device', 'cpu'))
+
+
+def compile_model(model, cnf):
+    """Returns the model to run the batches with, ``compile`` can be ``compile`` for
+    torch.compile or ``script`` for TorchScript. The parameters are shared with ``model``
+    """
+    method = cnf.get('compile')
+    if not method:
+        return model
+    if method == 'compile':
+        return torch.compile(model)
+    if method == 'script':
+        return torch.jit.script(model)
+    raise ValueError("unknown compile method {0}".format(method))
+
+
+def autocast(device, cnf):
+    # bfloat16 is the only reduced precision supported by autocast on CPU
+    dtype = cnf.get('autocast')
+    return torch.autocast(device_type=device.type, dtype=getattr(torch, dtype or 'bfloat16'),
+                          enabled=bool(dtype))
+
+
+def configure_scheduler(optimiser, cnf):
+    """Creates the learning rate scheduler configured as the optimizer, e.g.
+    ``{class: StepLR, args: {step_size: 5}}``, None if there is none"""
+    scheduler_cnf = cnf.get('scheduler')
+    if not scheduler_cnf:
+        return None
+    Scheduler = getattr(torch.optim.lr_scheduler, scheduler_cnf['class'])
+    return Scheduler(optimiser, **scheduler_cnf.get('args', {}))
+
+
+class EarlyStopping:
+    """Stops the training when the test loss has not improved by more than ``min_delta``
+    for ``patience`` epochs, the best parameters are kept to be restored
+    """
+    def __init__(self, patience: int, min_delta: float = 0.0):
+        self.patience = patience
+        self.min_delta = min_delta
+        self.best_loss = float('inf')
+        self.best_state = None
+        self.bad_epochs = 0
+
+    def update(self, model, loss: float) -> bool:
+        """Returns whether the training should stop"""
+        if loss < self.best_loss - self.min_delta:
+            self.best_loss = loss
+            self.best_state = copy.deepcopy(model.state_dict())
+            self.bad_epochs = 0
+        else:
+            self.bad_epochs += 1
+        return self.bad_epochs >= self.patience
+
+    def state_dict(self):
+        return dict(best_loss=self.best_loss, best_state=self.best_state,
+                    bad_epochs=self.bad_epochs)
+
+    def load_state_dict(self, state):
+        self.best_loss = state['best_loss']
+        self.best_state = state['best_state']
+        self.bad_epochs = state['bad_epochs']
+
+
+def save_checkpoint(checkpoint_path: str, checkpoint: dict):
+    # written to a temporary file first so that a killed job never leaves a partial checkpoint
+    tmp_path = checkpoint_path + '.tmp'
+    torch.save(checkpoint, tmp_path)
+    os.replace(tmp_path, checkpoint_path)
+
+
 def GRU_training(model,
                  train_dataloader,
                  test_dataloader,
@@ -11,60 +91,145 @@ def GRU_training(model,
     assert (isinstance(train_dataloader, du.DataLoader))
     assert (isinstance(test_dataloader, du.DataLoader))
 
+    device = configure_runtime(cnf)
+    model.to(device)
+    run_model = compile_model(model, cnf)
+    # the gradients of several batches are summed before every step
+    accumulation_steps = cnf.get('accumulation_steps', 1)
+
     loss_fn = torch.nn.MSELoss(reduction='mean')
     hist = []
     hist_test = []
+    samples_per_sec = []
     optimizer_cnf = cnf['optimizer']
     Optimizer = getattr(torch.optim, optimizer_cnf['class'])
     optimiser = Optimizer(model.parameters(), lr=cnf['learning_rate'], **optimizer_cnf['args'])
 
-    for t in tqdm(range(cnf['num_epochs'])):
+    scheduler = configure_scheduler(optimiser, cnf)
+    early_stopping_cnf = cnf.get('early_stopping')
+    early_stopping = EarlyStopping(**early_stopping_cnf) if early_stopping_cnf else None
+
+    start_epoch = 0
+    stopped = False
+    checkpoint_path = cnf.get('checkpoint_path')
+    if checkpoint_path and cnf.get('resume') and os.path.exists(checkpoint_path):
+        # loaded on the CPU, the RNG state must stay a CPU tensor
+        checkpoint = torch.load(checkpoint_path, map_location='cpu')
+        model.load_state_dict(checkpoint['model'])
+        optimiser.load_state_dict(checkpoint['optimizer'])
+        if scheduler is not None:
+            scheduler.load_state_dict(checkpoint['scheduler'])
+        if early_stopping is not None:
+            early_stopping.load_state_dict(checkpoint['early_stopping'])
+        hist, hist_test = checkpoint['hist'], checkpoint['hist_test']
+        samples_per_sec = checkpoint['samples_per_sec']
+        start_epoch = checkpoint['epoch'] + 1
+        stopped = checkpoint['stopped']
+        torch.set_rng_state(checkpoint['rng_state'])
+        print("Resuming from epoch", start_epoch)
+
+    # nothing left to do when resuming an early stopped training
+    end_epoch = start_epoch if stopped else cnf['num_epochs']
+    for t in tqdm(range(start_epoch, end_epoch)):
         batch_losses = 0
         len_train = 0
+        num_samples = 0
+        start = time.perf_counter()
         model.train()
+        optimiser.zero_grad(set_to_none=True)
         for batch_idx, (x, y) in enumerate(train_dataloader):
-            model.zero_grad()
+            x = x.to(device, non_blocking=True)
+            y = y.to(device, non_blocking=True)
             # Forward pass
-            y_pred = model(x)
-            loss = torch.sqrt(loss_fn(y_pred, y))
+            with autocast(device, cnf):
+                y_pred = run_model(x)
+                loss = torch.sqrt(loss_fn(y_pred.float(), y))
             # loss = loss_fn(y_pred, y)
             train_res = float(loss.item())
             # Backward pass
-            loss.backward()
+            (loss / accumulation_steps).backward()
 
-            optimiser.step()
-            optimiser.zero_grad()
+            if (batch_idx + 1) % accumulation_steps == 0:
+                optimiser.step()
+                optimiser.zero_grad(set_to_none=True)
 
             batch_losses += float(train_res)
             len_train += 1
+            num_samples += x.shape[0]
+        # step with the gradients of the last incomplete accumulation
+        if len_train % accumulation_steps != 0:
+            optimiser.step()
+            optimiser.zero_grad(set_to_none=True)
         hist.append(batch_losses / len_train)
+        samples_per_sec.append(num_samples / (time.perf_counter() - start))
 
         # Test loss
         model.eval()
         test_batch_losses = 0
         len_test = 0
-        for test_idx, (x_test, y_test) in enumerate(test_dataloader):
-            model.zero_grad()
-            with torch.no_grad():
-                y_test_pred = model(x_test)
+        with torch.no_grad(), autocast(device, cnf):
+            for test_idx, (x_test, y_test) in enumerate(test_dataloader):
+                x_test = x_test.to(device, non_blocking=True)
+                y_test = y_test.to(device, non_blocking=True)
+                y_test_pred = run_model(x_test)
                 # test_res = float(torch.sqrt(loss_fn(y_test_pred, y_test)).item())
-                test_res = float(loss_fn(y_test_pred, y_test).item())
+                test_res = float(loss_fn(y_test_pred.float(), y_test).item())
                 test_batch_losses += test_res
                 len_test += 1
         test_loss = test_batch_losses / len_test
         hist_test.append(test_loss)
+        print("Epoch {0}: {1:.0f} training samples/sec".format(t, samples_per_sec[-1]))
+
+        if scheduler is not None:
+            if isinstance(scheduler, torch.optim.lr_scheduler.ReduceLROnPlateau):
+                scheduler.step(test_loss)
+            else:
+                scheduler.step()
+        if early_stopping is not None:
+            stopped = early_stopping.update(model, test_loss)
+
+        if checkpoint_path:
+            save_checkpoint(checkpoint_path, dict(
+                epoch=t,
+                model=model.state_dict(),
+                optimizer=optimiser.state_dict(),
+                scheduler=scheduler.state_dict() if scheduler is not None else None,
+                early_stopping=early_stopping.state_dict() if early_stopping is not None else None,
+                hist=hist,
+                hist_test=hist_test,
+                samples_per_sec=samples_per_sec,
+                stopped=stopped,
+                rng_state=torch.get_rng_state(),
+            ))
+        if stopped:
+            print("Early stopping at epoch", t)
+            break
+
+    # the test loss of the returned model
+    final_testing_loss = hist_test[-1]
+    if early_stopping is not None and early_stopping.best_state is not None:
+        model.load_state_dict(early_stopping.best_state)
+        final_testing_loss = early_stopping.best_loss
 
+    t = len(hist) - 1
     print("Total num epochs trained:", t)
     print("Final training loss:", hist[-1])
-    print("Final testing loss:", hist_test[-1])
+    print("Final testing loss:", final_testing_loss)
 
     res_dict = {}
     res_dict['final_training_loss'] = hist[-1]
-    res_dict['final_testing_loss'] = hist_test[-1]
+    res_dict['final_testing_loss'] = final_testing_loss
+    res_dict['last_epoch_testing_loss'] = hist_test[-1]
     res_dict['epochs_trained'] = t
+    res_dict['early_stopped'] = stopped
+    if early_stopping is not None:
+        res_dict['best_testing_loss'] = early_stopping.best_loss
+    res_dict['training_samples_per_sec'] = sum(samples_per_sec) / len(samples_per_sec)
 
+    # the results are logged and saved on the CPU
+    model.to('cpu')
     if logger:
         logger.dump_results(model, hist_train=hist, hist_test=hist_test, res_dict=res_dict)
 
     # Return testing loss for the BO loop
-    return hist_test[-1]
+    return final_testing_loss
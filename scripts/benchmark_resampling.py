@@ -0,0 +1,59 @@
+"""
+Compares the incremental Resampler with pandas on the data of a configuration file:
+    python scripts/benchmark_resampling.py config/config_template_prep.yaml
+"""
+import sys
+import time
+
+import numpy as np
+import pandas as pd
+
+from ethpred.pipeline.data_reader import read_data
+from ethpred.pipeline.to_pandas import parse_block_columns, parse_gas_price_data, join_datasets
+from ethpred.pipeline.block_store import BlockColumns
+from ethpred.pipeline.resampling import Resampler
+from ethpred.utils.config_reader import read_config
+
+
+def timed(function, repeat=5):
+    times = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result = function()
+        times.append(time.perf_counter() - start)
+    return result, min(times)
+
+
+cnf = read_config(sys.argv[1])
+freq = cnf['data']['resample'] or '5T'
+features = cnf['data']['features']
+nested_features = cnf['data']['nested_features']
+
+eth_price, gas_price = read_data(cnf)
+if isinstance(gas_price, BlockColumns):
+    columns = parse_block_columns(cnf, features, gas_price, nested_features)
+else:
+    columns = parse_gas_price_data(cnf, features, gas_price, nested_features)
+data = join_datasets(cnf, eth_price, pd.DataFrame(columns))
+print("rows:", len(data), "columns:", len(data.columns))
+
+expected, pandas_time = timed(lambda: data.resample(freq).mean().ffill())
+result, batch_time = timed(lambda: Resampler(freq, data.columns).resample(data))
+
+
+def stream(block_size=1):
+    # one block at a time, as in a live feed
+    resampler = Resampler(freq, data.columns)
+    times = data.index.to_numpy()
+    values = data.to_numpy(dtype=np.float64)
+    for i in range(0, len(data), block_size):
+        resampler.update(times[i:i + block_size], values[i:i + block_size])
+    return resampler.flush()
+
+
+_, stream_time = timed(stream, repeat=1)
+
+print("max difference:", np.nanmax(np.abs(result.to_numpy() - expected.to_numpy())))
+print("pandas:    {0:.4f}s".format(pandas_time))
+print("resampler: {0:.4f}s".format(batch_time))
+print("stream:    {0:.4f}s, {1:.1f}us per block".format(stream_time, 1e6 * stream_time / len(data)))
@@ -4,13 +4,13 @@ from setuptools import setup, find_packages
 setup(
     name="ethpred",
     packages=find_packages(),
-    scripts=["./bin/dummy", "./bin/prep_data", "./bin/run_prepped", "./bin/run_evaluation"],
+    scripts=["./bin/dummy", "./bin/prep_data", "./bin/run_prepped", "./bin/run_evaluation",
+             "./bin/ingest_data", "./bin/index_data", "./bin/sweep"],
     install_requires=[
         "matplotlib",
         "tqdm",
         "pandas",
         "pyyaml",
         "sortedcontainers",
-        "scikit-learn",
     ],
 )
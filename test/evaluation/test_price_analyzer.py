@@ -1,5 +1,7 @@
 import unittest
 
+import numpy as np
+
 from ethpred.evaluation.price_analyzer import PriceAnalyzer
 
 
@@ -26,3 +28,12 @@ class PriceAnalyzerTest(unittest.TestCase):
         self.assertEqual(included[1].transaction.gas_price, 5)
         self.assertEqual(included[1].gas_price_diff, 0)
         self.assertEqual(included[1].blocks_waited, 1)
+
+    def test_analyze_prices_range(self):
+        prices = dict(enumerate([10, 9, 5, 6, 8, 7, 10]))
+        predictions = [6, 5, 4, 7, 9, 8]
+        predict_price = lambda block_number: predictions[block_number]
+        predict_range = lambda start, end: np.array(predictions[start:end + 1], dtype=float)
+        expected = PriceAnalyzer(prices, predict_price).analyze_prices(0, 5, 6)
+        actual = PriceAnalyzer(prices, predict_price, predict_range).analyze_prices(0, 5, 6)
+        self.assertEqual(actual.to_dict(), expected.to_dict())
@@ -0,0 +1,61 @@
+import unittest
+import tempfile
+import gzip
+import json
+from os import path
+
+import numpy as np
+
+from ethpred.pipeline.block_store import BlockColumns, read_jsonl_blocks, \
+    write_block_store, open_block_store
+
+
+def make_block(block_number, timestamp, prices):
+    block = dict(block_number=block_number, timestamp=timestamp, tx_count=len(prices),
+                 transactions=[dict(gas_price=v) for v in prices])
+    if prices:
+        block['average_gas_price'] = sum(prices) / len(prices)
+        block['min_price_tx'] = dict(gas_price=min(prices))
+        block['max_price_tx'] = dict(gas_price=max(prices))
+    return block
+
+
+class BlockStoreTest(unittest.TestCase):
+    def setUp(self):
+        self.blocks = [
+            make_block(103, 1000, [4, 5]),
+            make_block(102, 990, []),
+            make_block(101, 980, [1, 2, 3]),
+            make_block(100, 970, [7]),
+        ]
+
+    def test_from_blocks(self):
+        columns = BlockColumns.from_blocks(self.blocks)
+        self.assertEqual(columns['block_number'].tolist(), [100, 101, 102, 103])
+        self.assertEqual(columns.tx_offsets.tolist(), [0, 1, 4, 4, 6])
+        self.assertEqual(columns.transaction_prices(1).tolist(), [1, 2, 3])
+        self.assertTrue(np.isnan(columns['min_price_tx'][2]))
+        self.assertEqual(columns['max_price_tx'][3], 5)
+
+    def test_between(self):
+        columns = BlockColumns.from_blocks(self.blocks).between(980, 990)
+        self.assertEqual(columns['block_number'].tolist(), [101, 102])
+        self.assertEqual(columns.tx_offsets.tolist(), [0, 3, 3])
+        self.assertEqual(columns.tx_prices.tolist(), [1, 2, 3])
+
+    def test_store_round_trip(self):
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            gas_price_file = path.join(tmp_dir, 'gas.jsonl.gz')
+            with gzip.open(gas_price_file, 'wt') as f:
+                for block in self.blocks:
+                    f.write(json.dumps(block) + '\n')
+            store_path = path.join(tmp_dir, 'store')
+            write_block_store(read_jsonl_blocks(gas_price_file), store_path)
+            columns = open_block_store(store_path, columns=['min_price_tx'])
+            self.assertNotIn('max_price_tx', columns)
+            self.assertEqual(columns['timestamp'].tolist(), [970, 980, 990, 1000])
+            self.assertEqual(columns.tx_prices.tolist(), [7, 1, 2, 3, 4, 5])
+            blocks = columns.to_blocks()
+            self.assertEqual(blocks[0], dict(block_number=103, timestamp=1000,
+                                             min_price_tx=dict(gas_price=4)))
+            self.assertNotIn('min_price_tx', blocks[1])
@@ -0,0 +1,44 @@
+import unittest
+
+import numpy as np
+
+from ethpred.pipeline.calc_distributions import generate_segment_distributions, \
+    generate_transaction_summary
+
+
+class SegmentDistributionsTest(unittest.TestCase):
+    def test_matches_mean_std(self):
+        segments = [[3e10, 1e9, 2e9], [], [5e9], [4e10, 4e10 + 1]]
+        offsets = np.cumsum([0] + [len(v) for v in segments])
+        values = np.concatenate([np.array(v) for v in segments])
+        means, std_devs = generate_segment_distributions(offsets, values)
+        for i, segment in enumerate(segments):
+            if not segment:
+                self.assertTrue(np.isnan(means[i]))
+                self.assertTrue(np.isnan(std_devs[i]))
+                continue
+            self.assertAlmostEqual(means[i], np.mean(segment))
+            self.assertAlmostEqual(std_devs[i], np.std(segment), places=3)
+
+
+class TransactionSummaryTest(unittest.TestCase):
+    def setUp(self):
+        segments = [[5., 1., 3., 2.], [], [7.]]
+        self.offsets = np.cumsum([0] + [len(v) for v in segments])
+        self.values = np.concatenate([np.array(v) for v in segments])
+
+    def test_quantiles(self):
+        summary = generate_transaction_summary(self.offsets, self.values, 'quantiles', 3)
+        np.testing.assert_allclose(summary[0], np.quantile([5, 1, 3, 2], [0, 0.5, 1]))
+        self.assertTrue(np.all(np.isnan(summary[1])))
+        np.testing.assert_allclose(summary[2], [7, 7, 7])
+
+    def test_top_k(self):
+        summary = generate_transaction_summary(self.offsets, self.values, 'top_k', 2)
+        np.testing.assert_allclose(summary[0], [5, 3])
+        np.testing.assert_allclose(summary[2], [7, np.nan])
+
+    def test_histogram(self):
+        summary = generate_transaction_summary(self.offsets, self.values, 'histogram', 2,
+                                               min_price=1, max_price=100)
+        np.testing.assert_allclose(summary, [[1, 0], [0, 0], [1, 0]])
@@ -0,0 +1,28 @@
+import unittest
+import tempfile
+from os import path
+
+import numpy as np
+import pandas as pd
+
+from ethpred.pipeline.data_reader import ingest_eth_price, read_eth_price_store
+
+
+class EthPriceStoreTest(unittest.TestCase):
+    def test_non_numeric_column(self):
+        ticks = pd.DataFrame(dict(date=['2019-11-05 00:02', '2019-11-05 00:01', None],
+                                  value=[151.5, 150.0, 149.0], symbol=['ETH', 'ETH', 'ETH']))
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            cnf = dict(data=dict(eth_price_file=path.join(tmp_dir, 'eth.csv'),
+                                 eth_price_store=path.join(tmp_dir, 'eth.npz'),
+                                 eth_price_features=['value', 'date']))
+            ticks.to_csv(cnf['data']['eth_price_file'], index=False)
+            ingest_eth_price(cnf)
+            eth_price = read_eth_price_store(cnf['data']['eth_price_store'])
+        self.assertEqual(sorted(eth_price.columns), ['date', 'value'])
+        self.assertEqual(eth_price['date'].dtype, np.dtype('datetime64[ns]'))
+        self.assertEqual(eth_price['value'].tolist(), [150.0, 151.5])
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,62 @@
+import unittest
+import tempfile
+import gzip
+import os
+from os import path
+
+from ethpred.pipeline.dataset_cache import DatasetCache, frame_fields, hash_key
+from ethpred.pipeline.data_reader import source_identity
+from ethpred.pipeline.jsonl_index import build_index
+
+
+class DatasetCacheTest(unittest.TestCase):
+    def test_get_put(self):
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            cache = DatasetCache(tmp_dir)
+            self.assertIsNone(cache.get('raw', 'key', '2019-11-20'))
+            cache.put('raw', 'key', '2019-11-20', [dict(block_number=1)])
+            self.assertEqual(cache.get('raw', 'key', '2019-11-20'), [dict(block_number=1)])
+
+    def test_evict_least_recently_used(self):
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            cache = DatasetCache(tmp_dir)
+            for i, name in enumerate(['a', 'b', 'c']):
+                cache.put('raw', 'key', name, b'x' * 1000)
+                os.utime(cache.entry_path('raw', 'key', name), ns=(i * 10 ** 9, i * 10 ** 9))
+            cache.get('raw', 'key', 'a')
+            cache.max_size = 2500
+            cache.put('raw', 'key', 'd', b'x' * 10)
+            self.assertIsNone(cache.get('raw', 'key', 'b'))
+            for name in ['a', 'c', 'd']:
+                self.assertIsNotNone(cache.get('raw', 'key', name))
+
+    def test_frame_key_ignores_windowing(self):
+        cnf = dict(type='simple', testing=False,
+                   data=dict(features=['tx_count'], window_size=288, start_date='2019-11-20'))
+        key = hash_key(frame_fields(cnf))
+        cnf['data']['window_size'] = 80
+        self.assertEqual(hash_key(frame_fields(cnf)), key)
+        cnf['data']['features'].append('average_gas_price')
+        self.assertNotEqual(hash_key(frame_fields(cnf)), key)
+
+    def test_frame_key_ignores_source_paths(self):
+        cnf = dict(type='simple', testing=False, data=dict(features=['tx_count']))
+        key = hash_key(frame_fields(cnf))
+        cnf['data'].update(block_store='store', indexed_gas_price_file='gas-indexed.jsonl.gz',
+                           eth_price_store='eth.npz', gas_price_file='gas.jsonl.gz')
+        self.assertEqual(hash_key(frame_fields(cnf)), key)
+
+    def test_source_identity_of_indexed_file(self):
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            gas_price_file = path.join(tmp_dir, 'gas.jsonl.gz')
+            indexed_file = path.join(tmp_dir, 'gas-indexed.jsonl.gz')
+            with gzip.open(gas_price_file, 'wt') as f:
+                f.write('{"block_number": 1, "timestamp": 10}\n')
+            cnf = dict(testing=False, data=dict(gas_price_file=gas_price_file,
+                                                indexed_gas_price_file=indexed_file))
+            self.assertEqual(source_identity(cnf)['path'], gas_price_file)
+            build_index(gas_price_file, indexed_file)
+            self.assertEqual(source_identity(cnf)['path'], indexed_file)
+            # the tests read the first lines of the original file
+            cnf['testing'] = True
+            self.assertEqual(source_identity(cnf)['path'], gas_price_file)
@@ -0,0 +1,46 @@
+import unittest
+
+import numpy as np
+
+from ethpred.pipeline.fft_truncation import SlidingDFT, \
+    get_k_fft_by_percentage_energy_above_mean, truncate_fft_batched
+
+
+class SlidingDFTTest(unittest.TestCase):
+    def setUp(self):
+        rng = np.random.default_rng(0)
+        self.data = np.cumsum(rng.normal(size=(300, 3)), axis=0)
+        self.window_size = 48
+        starts = np.arange(len(self.data) - self.window_size + 1)
+        self.windows = self.data[starts[:, None] + np.arange(self.window_size)]
+
+    def test_matches_batch_truncation(self):
+        expected, _avg_k = get_k_fft_by_percentage_energy_above_mean(self.windows, 0.8)
+        sliding = SlidingDFT(self.data[:self.window_size], 0.8, recompute_every=100)
+        np.testing.assert_allclose(sliding.truncated()[0], expected[0], atol=1e-8)
+        for i in range(1, len(self.windows)):
+            reconstructed = sliding.push(self.data[self.window_size + i - 1])
+            np.testing.assert_allclose(sliding.window, self.windows[i])
+            np.testing.assert_allclose(reconstructed, expected[i], atol=1e-8)
+
+    def test_push_several_samples(self):
+        expected, _avg_k = get_k_fft_by_percentage_energy_above_mean(self.windows, 0.8)
+        sliding = SlidingDFT(self.data[:self.window_size], 0.8)
+        reconstructed = sliding.push(self.data[self.window_size:self.window_size + 5])
+        np.testing.assert_allclose(reconstructed, expected[5], atol=1e-8)
+
+
+class TruncateFFTBatchedTest(unittest.TestCase):
+    def test_matches_full_truncation(self):
+        rng = np.random.default_rng(1)
+        data = rng.normal(size=(50, 16, 2))
+        expected, expected_k = get_k_fft_by_percentage_energy_above_mean(data.copy(), 0.8)
+        for workers in (None, 2):
+            out, avg_k = truncate_fft_batched(data, 0.8, batch_size=7, dtype=np.float64,
+                                              workers=workers)
+            np.testing.assert_allclose(out, expected)
+            self.assertAlmostEqual(avg_k, expected_k)
+
+
+if __name__ == '__main__':
+    unittest.main()
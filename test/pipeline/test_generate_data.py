@@ -0,0 +1,104 @@
+import unittest
+
+import numpy as np
+import pandas as pd
+import torch
+
+from ethpred.pipeline.generate_data import sliding_window, window_starts, create_dataloader, \
+    to_tensor, create_dataloaders, create_lazy_dataloaders
+from ethpred.pipeline.dataset_objects import SlidingWindowData, FFTTruncationCollate
+
+
+class SlidingWindowTest(unittest.TestCase):
+    def setUp(self):
+        self.data = np.arange(3 * 50, dtype=np.float64).reshape(50, 3)
+        self.cnf_data = dict(window_size=8, y_len=3, sample_freq=2, fft=False, energy=0.8)
+
+    def test_sliding_window(self):
+        X, y, y_idx_start = sliding_window(self.data, self.cnf_data, return_indices=True)
+        starts = window_starts(len(self.data), self.cnf_data)
+        self.assertEqual(X.shape, (len(starts), 8, 3))
+        for i, start in enumerate(starts):
+            np.testing.assert_array_equal(X[i], self.data[start:start + 8])
+            np.testing.assert_array_equal(y[i], self.data[start + 8:start + 11])
+            self.assertEqual(y_idx_start[i], start + 8)
+
+    def test_windows_read_only(self):
+        X, y = sliding_window(self.data, self.cnf_data)
+        self.assertFalse(X.flags.writeable)
+        self.assertFalse(y.flags.writeable)
+        # the tensor is a copy, writing to it changes neither the data nor the other windows
+        x_t = to_tensor(X)
+        x_t[0] = -1
+        self.assertEqual(x_t.dtype, torch.float32)
+        self.assertTrue((self.data >= 0).all())
+        self.assertTrue((X >= 0).all())
+
+    def test_lazy_windows_match(self):
+        for fft in [False, True]:
+            with self.subTest(fft=fft):
+                cnf_data = dict(self.cnf_data, fft=fft)
+                X, y = sliding_window(self.data, cnf_data)
+                dataset = SlidingWindowData(torch.from_numpy(self.data),
+                                            window_starts(len(self.data), cnf_data), 8, 3, [1])
+                self.assertEqual(len(dataset), len(X))
+                batch = [dataset[i] for i in range(2, 5)]
+                if fft:
+                    x_t, y_t = FFTTruncationCollate(0.8, np.float64)(batch)
+                else:
+                    x_t = torch.stack([v[0] for v in batch])
+                    y_t = torch.stack([v[1] for v in batch])
+                np.testing.assert_allclose(x_t.numpy(), X[2:5], rtol=1e-5)
+                np.testing.assert_allclose(y_t.numpy(), y[2:5, :, 1])
+
+    def test_fft_collate_float32(self):
+        series = torch.from_numpy(self.data.astype(np.float32))
+        dataset = SlidingWindowData(series, window_starts(len(self.data), self.cnf_data), 8, 3, [1])
+        for dtype in (np.float32, np.float64):
+            with self.subTest(dtype=dtype):
+                x_t, _y_t = FFTTruncationCollate(0.8, dtype)([dataset[i] for i in range(3)])
+                self.assertEqual(x_t.dtype, torch.float32)
+                model = torch.nn.GRU(3, 4, batch_first=True)
+                model(x_t)
+
+
+class CreateDataloaderTest(unittest.TestCase):
+    def test_slices_match_collated_batches(self):
+        X = np.random.default_rng(0).random((23, 4, 2)).astype(np.float32)
+        y = np.random.default_rng(1).random((23, 3)).astype(np.float32)
+        batches = list(create_dataloader(X, y, 5))
+        self.assertEqual([len(v[0]) for v in batches], [5, 5, 5, 5, 3])
+        expected = list(torch.utils.data.DataLoader(
+            list(zip(torch.from_numpy(X), torch.from_numpy(y))), batch_size=5))
+        for (x_t, y_t), (x_e, y_e) in zip(batches, expected):
+            self.assertTrue(torch.equal(x_t, x_e))
+            self.assertTrue(torch.equal(y_t, y_e))
+
+    def test_shuffle_batches(self):
+        X = np.arange(20, dtype=np.float32).reshape(10, 1, 2)
+        y = np.arange(10, dtype=np.float32)
+        batches = list(create_dataloader(X, y, 4, shuffle=True))
+        self.assertEqual(sorted(v[1][0].item() for v in batches), [0, 4, 8])
+        self.assertEqual(sorted(torch.cat([v[1] for v in batches]).tolist()), list(range(10)))
+
+    def test_lazy_shuffle_matches_eager(self):
+        data = pd.DataFrame(np.random.default_rng(2).random((50, 3)).astype(np.float32),
+                            columns=['a', 'b', 'c'])
+        cnf = dict(type='simple', model=dict(), data=dict(
+            window_size=8, y_len=3, sample_freq=1, fft=False, y_cols=['b'], train_prop=0.8,
+            batch_size=4, shuffle=True))
+        X, y = sliding_window(data.to_numpy(), cnf['data'])
+        y = y[:, :, 1]
+        train_len = int(len(X) * 0.8)
+        eager = create_dataloaders(X[:train_len], y[:train_len], X[train_len:], y[train_len:],
+                                   cnf)
+        lazy = create_lazy_dataloaders(data, cnf)
+        for eager_loader, lazy_loader in zip(eager, lazy):
+            torch.manual_seed(3)
+            eager_batches = list(eager_loader)
+            torch.manual_seed(3)
+            lazy_batches = list(lazy_loader)
+            self.assertEqual(len(eager_batches), len(lazy_batches))
+            for (x_e, y_e), (x_l, y_l) in zip(eager_batches, lazy_batches):
+                self.assertTrue(torch.equal(x_e, x_l))
+                self.assertTrue(torch.equal(y_e, y_l))
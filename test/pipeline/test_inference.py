@@ -0,0 +1,18 @@
+import unittest
+
+import numpy as np
+
+from ethpred.pipeline.generate_data import sliding_window
+from ethpred.pipeline.inference import iter_windows
+
+
+class TestIterWindows(unittest.TestCase):
+    def test_same_windows_as_sliding_window(self):
+        data = np.random.rand(200, 3)
+        for fft in (False, True):
+            cnf_data = dict(window_size=24, y_len=6, sample_freq=2, fft=fft, energy=0.8)
+            X, _y, indices = sliding_window(data, cnf_data, return_indices=True)
+            batches = list(iter_windows(data, cnf_data, batch_size=7))
+            np.testing.assert_allclose(np.concatenate([v[0] for v in batches]), X, rtol=1e-6)
+            np.testing.assert_array_equal(np.concatenate([v[1] for v in batches]), indices)
+            self.assertTrue(all(len(v[0]) <= 7 for v in batches))
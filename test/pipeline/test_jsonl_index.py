@@ -0,0 +1,29 @@
+import unittest
+import tempfile
+import gzip
+import json
+from os import path
+
+from ethpred.pipeline.jsonl_index import build_index
+
+
+class GasPriceIndexTest(unittest.TestCase):
+    def test_members_between(self):
+        blocks = [dict(block_number=110 - i, timestamp=1100 - 10 * i) for i in range(10)]
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            gas_price_file = path.join(tmp_dir, 'gas.jsonl.gz')
+            indexed_file = path.join(tmp_dir, 'gas-indexed.jsonl.gz')
+            with gzip.open(gas_price_file, 'wt') as f:
+                for block in blocks:
+                    f.write(json.dumps(block) + '\n')
+            index = build_index(gas_price_file, indexed_file, lines_per_member=3)
+            self.assertEqual(len(index), 4)
+
+            with gzip.open(indexed_file, 'rt') as f:
+                self.assertEqual([json.loads(v) for v in f], blocks)
+
+            members = index.members_between(1030, 1050)
+            self.assertEqual(members.tolist(), [1, 2])
+            lines = list(index.iter_lines(indexed_file, members))
+            self.assertEqual([json.loads(v)['timestamp'] for v in lines],
+                             [1070, 1060, 1050, 1040, 1030, 1020])
@@ -0,0 +1,78 @@
+import unittest
+import tempfile
+from os import path
+
+import numpy as np
+import pandas as pd
+import torch
+
+from ethpred.pipeline import normalizers
+
+
+class NormalizersTest(unittest.TestCase):
+    def setUp(self):
+        self.series = pd.Series([2.0, 4.0, np.nan, 6.0])
+
+    def test_minmax_array_types(self):
+        normalizer = normalizers.create('minmax')
+        expected = normalizer.fit_transform(self.series).to_numpy()
+        np.testing.assert_allclose(expected, [0, 0.5, 0, 1])
+        np.testing.assert_allclose(normalizer.transform(self.series.to_numpy()), expected)
+        np.testing.assert_allclose(
+            normalizer.transform(torch.from_numpy(self.series.to_numpy())).numpy(), expected)
+        np.testing.assert_allclose(normalizer.inverse_transform(np.array([0.5])), [4.0])
+
+    def test_log_tensor(self):
+        normalizer = normalizers.create('log')
+        values = np.array([0.0, 1.0, np.e])
+        np.testing.assert_allclose(normalizer.transform(torch.from_numpy(values)).numpy(),
+                                   normalizer.transform(values.copy()))
+
+    def test_dump_and_load(self):
+        fitted = dict(a=normalizers.create('minmax'), b=normalizers.create('log'))
+        fitted['a'].fit(self.series)
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            filename = path.join(tmp_dir, normalizers.NORMALIZERS_FILE)
+            normalizers.dump_normalizers(fitted, filename)
+            loaded = normalizers.load_normalizers(filename)
+        self.assertIsInstance(loaded['b'], normalizers.LogNormalizer)
+        np.testing.assert_allclose(loaded['a'].transform(self.series.to_numpy()),
+                                   fitted['a'].transform(self.series).to_numpy())
+
+
+class StreamingMinMaxNormalizerTest(unittest.TestCase):
+    def test_partial_fit_matches_fit(self):
+        values = np.random.default_rng(0).normal(size=100)
+        expected = normalizers.create('minmax')
+        expected.fit(values)
+        normalizer = normalizers.create('streaming_minmax')
+        for i in range(0, 100, 7):
+            normalizer.partial_fit(values[i:i + 7])
+        self.assertEqual(normalizer.min_value, expected.min_value)
+        self.assertEqual(normalizer.max_value, expected.max_value)
+
+    def test_decay_and_freeze(self):
+        normalizer = normalizers.create('streaming_minmax', decay=0.5)
+        normalizer.fit(np.array([0.0, 10.0]))
+        normalizer.partial_fit(np.array([4.0, 4.0]))
+        self.assertEqual((normalizer.min_value, normalizer.max_value), (4.0, 5.5))
+        normalizer.freeze()
+        normalizer.partial_fit(np.array([100.0]))
+        self.assertEqual(normalizer.max_value, 5.5)
+        loaded = normalizers.load(normalizer.to_dict())
+        self.assertTrue(loaded.frozen)
+        self.assertEqual(loaded.max_value, 5.5)
+
+    def test_decay_batch_matches_stream(self):
+        values = np.random.default_rng(2).normal(10, 3, size=3000)
+        batch = normalizers.create('streaming_minmax', decay=0.99)
+        batch.fit(values)
+        stream = normalizers.create('streaming_minmax', decay=0.99)
+        for value in values:
+            stream.partial_fit(np.array([value]))
+        self.assertAlmostEqual(batch.min_value, stream.min_value, places=9)
+        self.assertAlmostEqual(batch.max_value, stream.max_value, places=9)
+
+
+if __name__ == '__main__':
+    unittest.main()
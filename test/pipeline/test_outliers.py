@@ -0,0 +1,83 @@
+import unittest
+import tempfile
+from os import path
+
+import numpy as np
+import pandas as pd
+
+from ethpred.pipeline.outliers import RunningStats, OutlierFilter, OUTLIER_FILTER_KEY
+from ethpred.pipeline.to_pandas import remove_outliers, get_outlier_filter, normalise_data
+from ethpred.pipeline.normalizers import dump_normalizers, load_normalizers
+
+
+class RunningStatsTest(unittest.TestCase):
+    def test_matches_pandas(self):
+        values = pd.Series(np.random.default_rng(0).normal(5, 2, size=200))
+        values[[3, 50]] = np.nan
+        stats = RunningStats()
+        for i in range(0, 200, 13):
+            stats.update(values[i:i + 13])
+        self.assertEqual(stats.count, 198)
+        self.assertAlmostEqual(stats.mean, values.mean())
+        self.assertAlmostEqual(stats.std, values.std())
+
+
+class OutlierFilterTest(unittest.TestCase):
+    def setUp(self):
+        rng = np.random.default_rng(1)
+        self.data = pd.DataFrame(dict(a=rng.normal(size=500), b=rng.normal(size=500)))
+
+    def test_matches_remove_outliers(self):
+        expected = remove_outliers(self.data, ['a', 'b'])
+        filtered = OutlierFilter(['a', 'b']).filter(self.data)
+        self.assertTrue(filtered.index.equals(expected.index))
+
+    def test_frozen(self):
+        outlier_filter = OutlierFilter(['a'])
+        outlier_filter.filter(self.data)
+        outlier_filter.freeze()
+        mean = outlier_filter.stats['a'].mean
+        filtered = outlier_filter.filter(pd.DataFrame(dict(a=[mean, mean + 100])))
+        self.assertEqual(len(filtered), 1)
+        restored = OutlierFilter.from_dict(outlier_filter.to_dict())
+        self.assertEqual(restored.stats['a'].count, 500)
+
+    def test_one_row_first_batch(self):
+        outlier_filter = OutlierFilter(['a'])
+        self.assertEqual(len(outlier_filter.filter(pd.DataFrame(dict(a=[1.0])))), 1)
+        self.assertEqual(len(outlier_filter.filter(pd.DataFrame(dict(a=[1.5])))), 1)
+
+
+class StreamingOutlierConfigTest(unittest.TestCase):
+    def setUp(self):
+        self.cnf = dict(data=dict(remove_outliers=['a'], scaling=dict(
+            normalizer='minmax', columns=['a'], outlier_filter='streaming')))
+        self.data = pd.DataFrame(dict(a=np.random.default_rng(2).normal(size=300)))
+
+    def test_batch_by_default(self):
+        del self.cnf['data']['scaling']['outlier_filter']
+        self.assertIsNone(get_outlier_filter(self.cnf))
+        _data, normalizers = normalise_data(self.data.copy(), self.cnf)
+        self.assertNotIn(OUTLIER_FILTER_KEY, normalizers)
+
+    def test_saved_with_normalizers(self):
+        data, normalizers = normalise_data(self.data.copy(), self.cnf, None,
+                                           get_outlier_filter(self.cnf))
+        self.assertTrue(data.index.equals(remove_outliers(self.data, ['a']).index))
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            filename = path.join(tmp_dir, 'normalizers.json')
+            dump_normalizers(normalizers, filename)
+            loaded = load_normalizers(filename, frozen=True)
+        outlier_filter = get_outlier_filter(self.cnf, loaded)
+        self.assertTrue(outlier_filter.frozen)
+        self.assertEqual(outlier_filter.stats['a'].count, 300)
+        # the new rows are filtered with the statistics of the training data
+        mean = outlier_filter.stats['a'].mean
+        new_data = pd.DataFrame(dict(a=[mean, mean + 100]))
+        filtered, _normalizers = normalise_data(new_data, self.cnf, loaded, outlier_filter)
+        self.assertEqual(len(filtered), 1)
+        self.assertEqual(outlier_filter.stats['a'].count, 300)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,26 @@
+import unittest
+import tempfile
+import gzip
+import json
+from os import path
+from datetime import datetime
+
+from ethpred.pipeline.parallel_reader import read_block_columns
+
+
+class ParallelReaderTest(unittest.TestCase):
+    def test_read_block_columns(self):
+        blocks = [dict(block_number=130 - i, timestamp=1300 - 10 * i,
+                       transactions=[dict(gas_price=i), dict(gas_price=i + 1)])
+                  for i in range(30)]
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            gas_price_file = path.join(tmp_dir, 'gas.jsonl.gz')
+            with gzip.open(gas_price_file, 'wt') as f:
+                for block in blocks:
+                    f.write(json.dumps(block) + '\n')
+            cnf = dict(type='distribution', data=dict(
+                gas_price_file=gas_price_file, reader_workers=2, reader_chunk_lines=4))
+            columns = read_block_columns(cnf, datetime.fromtimestamp(1050),
+                                         datetime.fromtimestamp(1200))
+        self.assertEqual(columns['block_number'].tolist(), list(range(105, 121)))
+        self.assertEqual(columns.transaction_prices(0).tolist(), [25, 26])
@@ -0,0 +1,44 @@
+import unittest
+
+import numpy as np
+import pandas as pd
+
+from ethpred.pipeline.resampling import Resampler
+
+
+class ResamplerTest(unittest.TestCase):
+    def setUp(self):
+        rng = np.random.default_rng(0)
+        seconds = np.sort(rng.integers(0, 86400, 3000))
+        # a gap of a few buckets
+        seconds = seconds[(seconds < 20000) | (seconds > 21500)]
+        index = pd.DatetimeIndex(pd.Timestamp('2019-11-05 07:13') + pd.to_timedelta(seconds, 's'),
+                                 name='time')
+        self.data = pd.DataFrame(dict(a=rng.random(len(index)), b=rng.random(len(index))),
+                                 index=index)
+        self.data.loc[self.data.index[:40], 'b'] = np.nan
+        self.data.loc[self.data.index[500:530], 'a'] = np.nan
+        self.expected = self.data.resample('5min').mean().ffill()
+
+    def test_matches_pandas(self):
+        result = Resampler('5min', self.data.columns).resample(self.data)
+        pd.testing.assert_frame_equal(result, self.expected, check_exact=False, rtol=1e-12)
+
+    def test_stream(self):
+        resampler = Resampler('5min', self.data.columns)
+        parts = [resampler.update(self.data.index[i:i + 97].to_numpy(),
+                                  self.data.iloc[i:i + 97].to_numpy())
+                 for i in range(0, len(self.data), 97)]
+        result = pd.concat(parts + [resampler.flush()])
+        np.testing.assert_allclose(result.to_numpy(), self.expected.to_numpy(), rtol=1e-12)
+        self.assertTrue(result.index.equals(self.expected.index))
+
+    def test_rows_out_of_order(self):
+        resampler = Resampler('5min', self.data.columns)
+        resampler.update(self.data.index[100:200].to_numpy(), self.data.iloc[100:200].to_numpy())
+        with self.assertRaises(ValueError):
+            resampler.update(self.data.index[:10].to_numpy(), self.data.iloc[:10].to_numpy())
+
+
+if __name__ == '__main__':
+    unittest.main()
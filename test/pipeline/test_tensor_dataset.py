@@ -0,0 +1,49 @@
+import unittest
+import tempfile
+
+import numpy as np
+import pandas as pd
+
+from ethpred.pipeline import normalizers
+from ethpred.pipeline.tensor_dataset import write_tensor_dataset, open_tensor_dataset
+
+
+class TensorDatasetTest(unittest.TestCase):
+    def setUp(self):
+        self.tmp_dir = tempfile.TemporaryDirectory()
+        self.cnf = dict(type='simple', data=dict(
+            window_size=4, y_len=2, sample_freq=1, train_prop=0.5, fft=False, energy=0.8,
+            y_cols=['b']))
+        self.data = pd.DataFrame(dict(a=np.arange(10.0), b=np.arange(10.0) * 2),
+                                 index=pd.date_range('2019-11-05', periods=10, freq='5min'))
+        self.X = np.arange(24, dtype=np.float32).reshape(3, 4, 2)
+        self.y = np.arange(6, dtype=np.float32).reshape(3, 2)
+        normalizer = normalizers.create('minmax')
+        normalizer.fit(self.data['b'])
+        self.normalizers = dict(b=normalizer)
+
+    def tearDown(self):
+        self.tmp_dir.cleanup()
+
+    def test_round_trip(self):
+        write_tensor_dataset(self.tmp_dir.name, self.data, self.X, self.y, self.normalizers,
+                             self.cnf)
+        dataset = open_tensor_dataset(self.tmp_dir.name, self.cnf)
+        np.testing.assert_array_equal(dataset.X, self.X)
+        np.testing.assert_array_equal(dataset.y, self.y)
+        np.testing.assert_array_equal(dataset.frame().to_numpy(), self.data.to_numpy())
+        self.assertEqual(list(dataset.frame().columns), ['a', 'b'])
+        X_train, y_train, X_test, y_test = dataset.split()
+        self.assertEqual((len(X_train), len(X_test)), (1, 2))
+        self.assertEqual(dataset.normalizers['b'].inverse_transform(1.0), 18.0)
+
+    def test_window_config_mismatch(self):
+        write_tensor_dataset(self.tmp_dir.name, self.data, self.X, self.y, self.normalizers,
+                             self.cnf)
+        self.cnf['data']['window_size'] = 8
+        with self.assertRaises(ValueError):
+            open_tensor_dataset(self.tmp_dir.name, self.cnf)
+
+
+if __name__ == '__main__':
+    unittest.main()
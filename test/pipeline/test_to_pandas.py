@@ -0,0 +1,54 @@
+import unittest
+
+import numpy as np
+import pandas as pd
+
+from ethpred.pipeline.to_pandas import join_datasets, nearest_index
+
+
+def merge_asof_join(cnf, eth_price_df, gas_price_df):
+    """The join as it was written with merge_asof, filtering after the joins"""
+    gas_price_df = gas_price_df.sort_values(by='time', kind='stable')
+    data = pd.merge_asof(gas_price_df, eth_price_df, left_on='time', right_on='date',
+                         direction='backward')
+    data.set_index('time', inplace=True, drop=False)
+    lag_cols = cnf['data']['lagged_cols']
+    lagged_data = pd.DataFrame(data[lag_cols], index=data.index).shift(1, freq='D')
+    lagged_data.columns = [i + '_lagged' for i in lag_cols]
+    data = pd.merge_asof(data, lagged_data, left_index=True, right_index=True, direction='nearest')
+    data = data[
+        (data['time'] > cnf['data']['start_date']) & (data['time'] <= cnf['data']['end_date'])]
+    return data.drop(columns=['time', 'date'])
+
+
+class JoinDatasetsTest(unittest.TestCase):
+    def test_matches_merge_asof(self):
+        rng = np.random.default_rng(0)
+        times = pd.Timestamp('2019-11-04') + pd.to_timedelta(
+            np.sort(rng.integers(0, 3 * 86400, 2000)), unit='s')
+        gas_price_df = pd.DataFrame(dict(
+            average_gas_price=rng.random(len(times)), time=times))
+        # newest first as in the JSONL file
+        gas_price_df = gas_price_df.iloc[::-1].reset_index(drop=True)
+        eth_price_df = pd.DataFrame(dict(
+            date=pd.date_range('2019-11-04 00:10', periods=3000, freq='min'),
+            value=rng.random(3000)))
+        cnf = dict(data=dict(eth_price_features=['date', 'value'], start_date='2019-11-05',
+                             end_date='2019-11-06 12:00',
+                             lagged_cols=['average_gas_price', 'value']))
+
+        expected = merge_asof_join(cnf, eth_price_df, gas_price_df)
+        data = join_datasets(cnf, eth_price_df, gas_price_df)
+        self.assertEqual(list(data.columns), list(expected.columns))
+        self.assertTrue((data.index == expected.index).all())
+        np.testing.assert_array_equal(data.to_numpy(), expected.to_numpy())
+
+    def test_nearest_index(self):
+        times = np.array([1, 3, 3, 7])
+        np.testing.assert_array_equal(nearest_index(times, np.array([0, 2, 3, 5, 6, 9])),
+                                      [0, 0, 2, 2, 3, 3])
+        np.testing.assert_array_equal(nearest_index(times[:0], np.array([1])), [-1])
+
+
+if __name__ == '__main__':
+    unittest.main()
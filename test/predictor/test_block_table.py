@@ -0,0 +1,46 @@
+import unittest
+import datetime as dt
+
+import numpy as np
+
+from ethpred.pipeline.block_store import BlockColumns
+from ethpred.predictor.block_table import BlockTable, NO_TIMESTAMP
+
+
+class BlockTableTest(unittest.TestCase):
+    def setUp(self):
+        # newest first as in the JSONL file, block 12 is missing and 13 is empty
+        self.raw_blocks = [
+            dict(block_number=14, timestamp=1574208040, min_price_tx=dict(gas_price=3)),
+            dict(block_number=13, timestamp=1574208030),
+            dict(block_number=11, timestamp=1574208020, min_price_tx=dict(gas_price=5)),
+            dict(block_number=10, timestamp=1574208010, min_price_tx=dict(gas_price=7)),
+        ]
+
+    def test_from_blocks(self):
+        table = BlockTable.create(self.raw_blocks)
+        self.assertEqual((table.first_block, table.last_block), (10, 14))
+        self.assertEqual(table.get_min_price(10), 7)
+        self.assertIsNone(table.get_min_price(12))
+        self.assertEqual(table.get_min_price(13, 0), 0)
+        self.assertEqual(table.get_min_price(100, -1), -1)
+        self.assertNotIn(12, table)
+        self.assertIn(13, table)
+        self.assertEqual(table.get_datetime(11), dt.datetime.fromtimestamp(1574208020))
+        self.assertIsNone(table.get_datetime(12))
+
+    def test_same_as_columns(self):
+        table = BlockTable.create(self.raw_blocks)
+        columns = BlockTable.create(BlockColumns.from_blocks(self.raw_blocks))
+        np.testing.assert_array_equal(table.min_prices, columns.min_prices)
+        np.testing.assert_array_equal(table.timestamps, columns.timestamps)
+        np.testing.assert_array_equal(table.present, columns.present)
+        self.assertIs(BlockTable.create(table), table)
+
+    def test_ranges(self):
+        table = BlockTable.create({10: 7, 11: 5, 13: 3})
+        np.testing.assert_array_equal(table.min_prices_range(11, 13), [5, 0, 3])
+        np.testing.assert_array_equal(table.min_prices_range(8, 11), [0, 0, 7, 5])
+        np.testing.assert_array_equal(table.min_prices_range(20, 21), [0, 0])
+        np.testing.assert_array_equal(table.present_range(12, 14), [False, True, False])
+        self.assertTrue(np.all(table.timestamps_range(10, 13) == NO_TIMESTAMP))
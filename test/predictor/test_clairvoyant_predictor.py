@@ -1,5 +1,7 @@
 import unittest
 
+import numpy as np
+
 from ethpred.predictor.clairvoyant_predictor import ClairvoyantPredictor
 
 
@@ -10,3 +12,24 @@ class ClairvoyantPredictorTest(unittest.TestCase):
         self.assertEqual(predictor.predict_price(0), 5)
         self.assertEqual(predictor.predict_price(1), 2)
         self.assertEqual(predictor.predict_price(2), 2)
+
+    def test_predict_price_max_stdevs(self):
+        # 100 is an outlier more than one standard deviation under the mean
+        prices = dict(enumerate([0, 900, 100, 1000, 1100, 0, 950]))
+        predictor = ClairvoyantPredictor(prices, 4, max_stdevs=1)
+        self.assertEqual(predictor.predict_price(0), 900)
+        self.assertEqual(predictor.predict_price(2), 1000)
+        # going back rebuilds the window
+        self.assertEqual(predictor.predict_price(1), 1000)
+
+    def test_predict_range(self):
+        rng = np.random.default_rng(0)
+        raw_prices = rng.integers(1, 10 ** 12, 300)
+        raw_prices[rng.random(300) < 0.3] = 0
+        prices = {i: int(v) for i, v in enumerate(raw_prices)}
+        for max_stdevs in (None, 0.5, 2):
+            predictor = ClairvoyantPredictor(prices, 20, max_stdevs)
+            expected = [predictor.predict_price(v) for v in range(0, 270)]
+            predictor = ClairvoyantPredictor(prices, 20, max_stdevs)
+            actual = predictor.predict_range(0, 269, chunk_size=64)
+            np.testing.assert_array_equal(actual, expected)
@@ -1,5 +1,6 @@
 import unittest
 
+import numpy as np
 
 from ethpred.predictor.geth_predictor import GethPredictor
 
@@ -15,3 +16,43 @@ class GethPredictorTest(unittest.TestCase):
                 predictor = GethPredictor(self.min_prices, blocks_count=1, percentile=percentile)
                 actual = predictor.predict_price(105)
                 self.assertEqual(actual, expected)
+
+    def test_empty_blocks(self):
+        # with blocks_count=1 the first empty block is skipped, the next ones count as 0
+        min_prices = {99: 6, 100: 4, 101: 2, 102: 0, 103: 5, 104: 3}
+        predictor = GethPredictor(min_prices, blocks_count=1, percentile=0)
+        self.assertEqual(predictor.predict_price(105), 2)
+        min_prices[101] = 0
+        predictor = GethPredictor(min_prices, blocks_count=1, percentile=0)
+        self.assertEqual(predictor.predict_price(105), 0)
+
+    def test_sliding_window(self):
+        rng = np.random.default_rng(0)
+        prices = rng.integers(1, 100, 300) * 10 ** 9
+        prices[rng.random(300) < 0.2] = 0
+        min_prices = {i + 1000: int(v) for i, v in enumerate(prices)}
+        predictor = GethPredictor(min_prices, blocks_count=4, percentile=60)
+        for block_number in list(range(1000, 1300)) + [1250, 1100, 1299]:
+            # the same walk back as geth for every block
+            window = []
+            empty_skipped = 0
+            current_block_number = block_number - 1
+            while current_block_number >= 0 and len(window) < predictor.max_blocks:
+                price = min_prices.get(current_block_number, 0)
+                current_block_number -= 1
+                if price == 0 and empty_skipped < predictor.max_empty:
+                    empty_skipped += 1
+                    continue
+                window.append(price)
+            expected = int(np.percentile(window, q=60))
+            self.assertEqual(predictor.predict_price(block_number), expected)
+
+    def test_predict_range(self):
+        rng = np.random.default_rng(1)
+        prices = rng.integers(1, 100, 200) * 10 ** 9
+        prices[rng.random(200) < 0.3] = 0
+        min_prices = {i + 10: int(v) for i, v in enumerate(prices) if i % 17}
+        for percentile in (0, 33, 60, 100):
+            predictor = GethPredictor(min_prices, blocks_count=3, percentile=percentile)
+            expected = [predictor.predict_price(v) for v in range(0, 220)]
+            np.testing.assert_array_equal(predictor.predict_range(0, 219, chunk_size=50), expected)
@@ -0,0 +1,33 @@
+import unittest
+import datetime as dt
+
+import numpy as np
+import pandas as pd
+
+from ethpred.predictor.model_predictor import ModelPredictor, trend_slopes, min_max_scale
+
+
+class ModelPredictorTest(unittest.TestCase):
+    def test_trend_slopes(self):
+        predictions = np.random.default_rng(0).uniform(1, 10, (20, 12))
+        expected = [np.polyfit(np.arange(12), v, 1)[0] for v in predictions]
+        np.testing.assert_allclose(trend_slopes(predictions), expected, rtol=1e-10)
+
+    def test_min_max_scale(self):
+        np.testing.assert_allclose(min_max_scale(np.array([1.0, 3.0, 2.0]), -2, 0), [-2, 0, -1])
+        np.testing.assert_array_equal(min_max_scale(np.array([5.0, 5.0]), -2, 0), [-2, -2])
+
+    def test_predict_price(self):
+        blocks = [dict(block_number=10 + i, timestamp=1574208000 + 60 * i,
+                       min_price_tx=dict(gas_price=10 ** 9)) for i in range(6)]
+        times = [pd.Timestamp(dt.datetime.fromtimestamp(1574208000 + 120 * i)).value
+                 for i in range(3)]
+        # decreasing, constant and increasing predictions
+        predictions = np.array([[4.0, 3.0, 2.0, 1.0], [2.0, 2.0, 2.0, 2.0], [1.0, 3.0, 5.0, 7.0]])
+        predictor = ModelPredictor(blocks, times, predictions, percentile=50, utility=1.0)
+        np.testing.assert_allclose(predictor.trends, [-2, -4 / 3, 0], atol=1e-12)
+        self.assertAlmostEqual(predictor.predict_price(10), 2.5 * np.exp(-2))
+        self.assertAlmostEqual(predictor.predict_price(13), 2.0 * np.exp(-4 / 3))
+        self.assertAlmostEqual(predictor.predict_price(15), 4.0)
+        np.testing.assert_array_equal(predictor.predict_range(10, 15),
+                                      [predictor.predict_price(v) for v in range(10, 16)])
@@ -0,0 +1,81 @@
+import unittest
+import tempfile
+import copy
+from os import path
+
+import numpy as np
+import pandas as pd
+import torch
+
+from ethpred.run_sweep import Sweep, sample_params, trial_config, share_series, run_trial
+
+
+def sweep_config(tmp_dir: str, trials: int) -> dict:
+    data = pd.DataFrame(np.random.default_rng(0).random((60, 2)), columns=['a', 'b'])
+    data_path = path.join(tmp_dir, 'prep.pickle')
+    data.to_pickle(data_path)
+    return dict(
+        type='simple',
+        data=dict(data_path=data_path, y_cols=['b'], window_size=4, y_len=2, sample_freq=1,
+                  train_prop=0.7, batch_size=8, fft=False),
+        model=dict(hidden_size=4, num_layers=1, pred_steps=2, linear_units=4, dropout=0),
+        training=dict(learning_rate=0.01, num_epochs=4, optimizer={'class': 'Adam', 'args': {}}),
+        sweep=dict(path=path.join(tmp_dir, 'sweep'), method='halving', trials=trials,
+                   min_epochs=1, reduction_factor=2, workers=2,
+                   space={'model.hidden_size': [4, 8]}))
+
+
+class SweepTest(unittest.TestCase):
+    def test_sample_params(self):
+        space = {
+            'data.window_size': [144, 288],
+            'data.energy': dict(low=0.6, high=0.9),
+            'model.hidden_size': dict(low=16, high=128, int=True),
+            'training.learning_rate': dict(low=1e-4, high=1e-2, log=True),
+        }
+        rng = np.random.default_rng(0)
+        for _ in range(20):
+            params = sample_params(rng, space)
+            self.assertIn(params['data.window_size'], [144, 288])
+            self.assertTrue(0.6 <= params['data.energy'] <= 0.9)
+            self.assertIsInstance(params['model.hidden_size'], int)
+            self.assertTrue(1e-4 <= params['training.learning_rate'] <= 1e-2)
+
+    def test_trial_config(self):
+        cnf = dict(data=dict(window_size=288), model=dict(hidden_size=64), sweep=dict())
+        trial_cnf = trial_config(cnf, {'data.window_size': 144})
+        self.assertEqual(trial_cnf['data']['window_size'], 144)
+        self.assertEqual(cnf['data']['window_size'], 288)
+        self.assertNotIn('sweep', trial_cnf)
+
+
+class HalvingSweepTest(unittest.TestCase):
+    def test_halving_rungs(self):
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            cnf = sweep_config(tmp_dir, 4)
+            sweep = Sweep(cnf)
+            results = sweep.run()
+            self.assertEqual(results['epochs'].tolist(), [1, 1, 1, 1, 2, 2, 4])
+            self.assertTrue((results['status'] == 'done').all())
+            self.assertTrue(path.exists(path.join(cnf['sweep']['path'], 'results.csv')))
+
+            # the best trial is resumed from its checkpoint at every rung, which must give
+            # the same loss as training it for all the epochs at once
+            best = results[results['epochs'] == 4].iloc[0]
+            checkpoint = torch.load(path.join(cnf['sweep']['path'],
+                                              'trial_{0}.pt'.format(int(best['trial']))))
+            self.assertEqual(len(checkpoint['hist_test']), 4)
+            trial_cnf = copy.deepcopy(Sweep(cnf).trial_configs()[int(best['trial'])][2])
+            trial_cnf['training'].update(num_epochs=4, checkpoint_path=None)
+            series_path, columns = share_series(cnf, tmp_dir)
+            expected = run_trial(trial_cnf, series_path, columns)
+            self.assertEqual(best['testing_loss'], expected['testing_loss'])
+
+    def test_no_trials(self):
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            results = Sweep(sweep_config(tmp_dir, 0)).run()
+            self.assertTrue(results.empty)
+
+
+if __name__ == '__main__':
+    unittest.main()
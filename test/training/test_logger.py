@@ -0,0 +1,60 @@
+import os
+import tempfile
+import unittest
+
+import numpy as np
+import pandas as pd
+import torch
+import torch.utils.data as du
+
+from ethpred.pipeline.generate_data import create_dataloader, ordered_dataloader
+from ethpred.pipeline.dataset_objects import SlidingWindowData
+from ethpred.training.logger import Logger
+
+
+class TestFastLogging(unittest.TestCase):
+    def test_ordered_lazy_dataloader(self):
+        series = torch.arange(60, dtype=torch.float32).reshape(20, 3)
+        dataset = SlidingWindowData(series, np.arange(0, 12), 4, 2, [0])
+        dataloader = du.DataLoader(dataset, batch_size=5, shuffle=True, drop_last=True)
+        batches = list(ordered_dataloader(dataloader))
+        self.assertEqual(sum(len(v[0]) for v in batches), 12)
+        torch.testing.assert_close(torch.cat([v[0] for v in batches])[:, 0], series[:12])
+
+    def test_save_predictions(self):
+        X = np.random.rand(10, 4, 3).astype(np.float32)
+        y = np.random.rand(10, 2).astype(np.float32)
+        model = torch.nn.Sequential(torch.nn.Flatten(), torch.nn.Linear(12, 2))
+        dataloaders = (create_dataloader(X[:7], y[:7], batch_size=3, shuffle=True),
+                       create_dataloader(X[7:], y[7:], batch_size=3))
+        with tempfile.TemporaryDirectory() as tmp:
+            cnf = dict(type='simple', training=dict(log_path=tmp, log_mode='fast', plots='none',
+                                                    save_model=False, show_plots=False))
+            logger = Logger(cnf, dataloaders=dataloaders)
+            logger.dump_results(model, [1.0, 0.5], [1.2, 0.7], dict(final_testing_loss=0.7))
+
+            self.assertEqual(sorted(os.listdir(logger.save_path)),
+                             ['config_and_results.txt', 'loss_hist.npy', 'preds_test.npy',
+                              'preds_train.npy', 'true_test.npy', 'true_train.npy'])
+            preds = np.load(os.path.join(logger.save_path, 'preds_train.npy'))
+            self.assertEqual(preds.dtype, np.float32)
+            with torch.no_grad():
+                np.testing.assert_allclose(preds, model(torch.from_numpy(X[:7])).numpy(),
+                                           rtol=1e-6, atol=1e-6)
+            for name, expected in (('true_train.npy', y[:7]), ('true_test.npy', y[7:])):
+                saved = np.load(os.path.join(logger.save_path, name))
+                np.testing.assert_array_equal(saved, expected)
+
+    def test_fast_without_dataloaders(self):
+        data = pd.DataFrame(dict(a=np.random.rand(40), b=np.random.rand(40)))
+        model = torch.nn.Sequential(torch.nn.Flatten(), torch.nn.Linear(8, 2))
+        with tempfile.TemporaryDirectory() as tmp:
+            cnf = dict(type='simple', model=dict(),
+                       data=dict(y_cols=['b'], window_size=4, y_len=2, sample_freq=1,
+                                 train_prop=0.5, fft=False),
+                       training=dict(log_path=tmp, log_mode='fast', plots='none',
+                                     save_model=False, show_plots=False))
+            logger = Logger(cnf, data=data)
+            with self.assertLogs(level='WARNING'):
+                logger.dump_results(model, [1.0], [1.2], dict(final_testing_loss=1.2))
+            self.assertIn('preds.npy', os.listdir(logger.save_path))
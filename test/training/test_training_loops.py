@@ -0,0 +1,54 @@
+import os
+import tempfile
+import unittest
+
+import numpy as np
+import torch
+
+from ethpred.pipeline.generate_data import create_dataloader
+from ethpred.training.training_loops import GRU_training
+
+
+def create_model():
+    torch.manual_seed(0)
+    return torch.nn.Sequential(torch.nn.Flatten(), torch.nn.Linear(12, 2))
+
+
+class TrainingTest(unittest.TestCase):
+    def setUp(self):
+        rng = np.random.default_rng(0)
+        X = rng.random((40, 4, 3)).astype(np.float32)
+        y = rng.random((40, 2)).astype(np.float32)
+        self.train = create_dataloader(X[:30], y[:30], 4, shuffle=True)
+        self.test = create_dataloader(X[30:], y[30:], 4)
+        self.cnf = dict(learning_rate=0.01, num_epochs=4,
+                        optimizer={'class': 'Adam', 'args': {}})
+
+    def test_resume_matches_uninterrupted(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            cnf = dict(self.cnf, checkpoint_path=os.path.join(tmp, 'ck.pt'), resume=True)
+            torch.manual_seed(1)
+            expected_loss = GRU_training(create_model(), self.train, self.test, cnf)
+            expected_state = torch.load(cnf['checkpoint_path'])['model']
+            os.remove(cnf['checkpoint_path'])
+
+            # interrupted after 2 epochs then resumed from the checkpoint
+            torch.manual_seed(1)
+            GRU_training(create_model(), self.train, self.test, dict(cnf, num_epochs=2))
+            model = create_model()
+            loss = GRU_training(model, self.train, self.test, cnf)
+            self.assertEqual(loss, expected_loss)
+            for name, value in model.state_dict().items():
+                torch.testing.assert_close(value, expected_state[name], rtol=0, atol=0)
+
+    def test_early_stopping_returns_best_loss(self):
+        # no epoch can improve by min_delta after the first one, which is the best
+        cnf = dict(self.cnf, num_epochs=10, early_stopping=dict(patience=2, min_delta=1e9))
+        model = create_model()
+        loss = GRU_training(model, self.train, self.test, cnf)
+        last_loss = GRU_training(create_model(), self.train, self.test,
+                                 dict(self.cnf, num_epochs=3))
+        self.assertNotEqual(loss, last_loss)
+        with torch.no_grad():
+            losses = [torch.nn.functional.mse_loss(model(x), y).item() for x, y in self.test]
+        self.assertAlmostEqual(loss, np.mean(losses), places=5)